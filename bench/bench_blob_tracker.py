@@ -0,0 +1,86 @@
+"""!
+@file bench_blob_tracker.py
+This file runs BlobFinder and TargetTracker on a synthetic sequence of
+three warm targets drifting across the view with noise, and reports the
+time per frame of each stage, how well blob centroids match the targets
+and whether each target keeps one track number throughout.
+"""
+
+import math
+import random
+import time
+from blob_tracker import BlobFinder, TargetTracker
+from hotspot import SUBPIXEL_BITS
+from mlx90640.calibration import NUM_COLS, IMAGE_SIZE
+from mlx90640.emulator import HotSpotScene
+from mlx90640.utils import array_filled
+
+## The number of frames in the sequence
+FRAMES = 100
+## Standard deviation of the pixel noise in raw counts
+NOISE = 20
+## Start position and velocity in pixels per frame of each target; the
+#  targets stay more than five pixels apart so their blobs never merge
+TARGETS = (
+    (4.0, 4.0, 0.10, 0.03),
+    (27.0, 5.0, -0.05, 0.08),
+    (8.0, 20.0, 0.12, -0.02),
+)
+
+
+def make_frame(frame, scenes, pix, scratch):
+    for idx in range(IMAGE_SIZE):
+        pix[idx] = int(random.gauss(0, NOISE))
+    for scene in scenes:
+        scene(frame, scratch)
+        for idx in range(IMAGE_SIZE):
+            pix[idx] += scratch[idx]
+
+
+def main():
+    random.seed(5)
+    scenes = [HotSpotScene(x=x, y=y, vx=vx, vy=vy, radius=1.0, peak=500)
+              for x, y, vx, vy in TARGETS]
+    pix = array_filled('h', IMAGE_SIZE)
+    scratch = array_filled('h', IMAGE_SIZE)
+    finder = BlobFinder(threshold=150)
+    tracker = TargetTracker()
+    scale = 1 << SUBPIXEL_BITS
+
+    find_s = 0.0
+    update_s = 0.0
+    errors = []
+    ids = [set() for _ in scenes]
+    for frame in range(FRAMES):
+        make_frame(frame, scenes, pix, scratch)
+        start = time.perf_counter()
+        finder.find(pix)
+        middle = time.perf_counter()
+        tracker.update(finder)
+        find_s += middle - start
+        update_s += time.perf_counter() - middle
+
+        # Match each target to its nearest blob and its nearest track, in
+        # the mirrored coordinates the finder uses
+        for target, scene in enumerate(scenes):
+            x, y = scene.position(frame)
+            x = NUM_COLS - 0.5 - x
+            if finder.count:
+                errors.append(min(math.hypot(finder.x_fp[b] / scale - x,
+                                             finder.y_fp[b] / scale - y)
+                                  for b in range(finder.count)))
+            live = [slot for slot in range(tracker.max_tracks) if tracker.track_id[slot]]
+            if live:
+                slot = min(live, key=lambda s: math.hypot(tracker.x_fp[s] / scale - x,
+                                                          tracker.y_fp[s] / scale - y))
+                ids[target].add(tracker.track_id[slot])
+
+    print(f"find    {find_s * 1e6 / FRAMES:8.0f} us/frame")
+    print(f"update  {update_s * 1e6 / FRAMES:8.0f} us/frame")
+    print(f"centroid error mean {sum(errors) / len(errors):.3f} px, max {max(errors):.3f} px")
+    for target, seen in enumerate(ids):
+        print(f"target {target} track ids {sorted(seen)}")
+
+
+if __name__ == "__main__":
+    main()
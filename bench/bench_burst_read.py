@@ -0,0 +1,39 @@
+"""!
+@file bench_burst_read.py
+This file benchmarks RawImage.read() against the emulated camera, counting
+the I2C transactions and bytes each subpage read takes with one register per
+transaction and with bursts of whole pixel RAM rows.
+"""
+
+from benchlib import time_per_call
+from mlx90640.calibration import NUM_ROWS
+from mlx90640.emulator import EmulatedCamera, CAMERA_ADDRESS
+from mlx90640.image import ChessPattern, InterleavedPattern, RawImage
+from mlx90640.regmap import CameraInterface
+
+
+def measure(pattern, burst_rows):
+    camera = EmulatedCamera(realtime=False)
+    iface = CameraInterface(camera, CAMERA_ADDRESS)
+    raw = RawImage(burst_rows=burst_rows)
+    indices = pattern.sp_range(0)
+
+    raw.read(iface, indices)
+    transactions = camera.transactions
+    nbytes = camera.bytes_read
+    us = time_per_call(lambda: raw.read(iface, indices), calls=20)
+    return transactions, nbytes, us
+
+
+def main():
+    print(f"{'pattern':20s}{'burst rows':>11s}{'transactions':>14s}"
+          f"{'bytes':>8s}{'us/subpage':>12s}")
+    for pattern in (ChessPattern, InterleavedPattern):
+        for burst_rows in (0, 1, 4, NUM_ROWS):
+            transactions, nbytes, us = measure(pattern, burst_rows)
+            print(f"{pattern.__name__:20s}{burst_rows:11d}{transactions:14d}"
+                  f"{nbytes:8d}{us:12.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+"""!
+@file bench_calib_cache.py
+This file times the start of the camera driver, from creating the
+MLX90640 object to reading its first subpage, without the calibration
+cache file, with an empty one (a first boot) and with a filled one, and
+checks that changing the EEPROM makes the driver rebuild a stale cache.
+
+No real EEPROM dump is kept in the tree, so the emulated camera is given a
+seeded random EEPROM which decodes to numbers in range. A subpage is ready
+in the emulator's RAM before each start, so the times don't include
+waiting for the camera's refresh period.
+"""
+
+import os
+import random
+import tempfile
+import time
+from mlx90640 import MLX90640
+from mlx90640.calibration import CameraCalibration, IMAGE_SIZE, PIX_CALIB_ADDRESS
+from mlx90640.emulator import EmulatedCamera, HotSpotScene, CAMERA_ADDRESS
+from mlx90640.regmap import EepromImage, EEPROM_ADDRESS, EEPROM_SIZE, EEPROM_MAP, RegisterMap
+
+## Starts timed in each case, of which the fastest is reported
+REPEAT = 5
+
+
+def random_eeprom():
+    # Not every random EEPROM decodes to numbers in range, so try seeds
+    # until one does
+    for seed in range(100):
+        random.seed(seed)
+        image = EepromImage(bytearray(random.randrange(256)
+                                      for _ in range(EEPROM_SIZE * 2)))
+        try:
+            CameraCalibration(image, RegisterMap(image, EEPROM_MAP, readonly=True))
+        except OverflowError:
+            continue
+        return image
+    raise RuntimeError("no usable random EEPROM")
+
+
+def boot(camera, cache):
+    # Returns the driver and the time in ms to its first subpage
+    camera.measure()
+    start = time.perf_counter()
+    driver = MLX90640(camera, CAMERA_ADDRESS)
+    driver.setup(calibrated=True, calib_cache=cache)
+    driver.read_image()
+    return driver, (time.perf_counter() - start) * 1000
+
+
+def best_boot(camera, cache, cold):
+    best = None
+    for _ in range(REPEAT):
+        if cold and os.path.exists(cache):
+            os.remove(cache)
+        _, ms = boot(camera, cache)
+        if best is None or ms < best:
+            best = ms
+    return best
+
+
+def same_calibration(calib, other):
+    return all(list(getattr(calib, name)) == list(getattr(other, name))
+               for name in ('pix_os_ref', 'os_kta', 'pix_alpha', 'il_offset'))
+
+
+def check_invalidation(camera, cache):
+    # Fill the cache, then change the offset bits of one pixel's word
+    before, _ = boot(camera, cache)
+    word = PIX_CALIB_ADDRESS + 5 - EEPROM_ADDRESS
+    camera.eeprom[word] ^= 0x1000
+    cached, _ = boot(camera, cache)
+    fresh, _ = boot(camera, None)
+    if same_calibration(before.calib, fresh.calib):
+        raise AssertionError("the changed EEPROM word should change the calibration")
+    if not same_calibration(cached.calib, fresh.calib):
+        raise AssertionError("a changed EEPROM word didn't invalidate the cache")
+    camera.eeprom[word] ^= 0x1000
+
+
+def main():
+    camera = EmulatedCamera(HotSpotScene(), eeprom=random_eeprom(), realtime=False)
+    with tempfile.TemporaryDirectory() as directory:
+        cache = os.path.join(directory, "calib.bin")
+        check_invalidation(camera, cache)
+
+        print(f"{'calibration cache':22s}{'boot to first frame ms':>24s}")
+        for name, cache_file, cold in (("none", None, False),
+                                       ("cold (file written)", cache, True),
+                                       ("warm (file read)", cache, False)):
+            ms = best_boot(camera, cache_file, cold)
+            print(f"{name:22s}{ms:24.1f}")
+    print(f"({IMAGE_SIZE} pixels; a changed EEPROM word rebuilt the cache)")
+
+
+if __name__ == "__main__":
+    main()
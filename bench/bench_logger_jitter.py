@@ -0,0 +1,81 @@
+"""!
+@file bench_logger_jitter.py
+This file measures how late a 40 ms control task starts when a picture
+task prints its messages, compared with logging them to the deferred
+EventLog and printing them from a flusher in idle time.
+
+Printing is slowed to the speed of a 115200 baud REPL, about 87 us per
+character, by busy-waiting. The tasks are run by a simple loop in which the
+control task has the highest priority, as under the cooperative scheduler.
+"""
+
+import builtins
+import time
+import utime
+import event_log
+from benchlib import percentile
+
+## Seconds to run each mode
+DURATION = 3
+## Time to send one character to the REPL, in microseconds
+CHAR_US = 87
+## The control task's period in microseconds
+CONTROL_PERIOD = 40000
+## The picture task's period in microseconds
+PICTURE_PERIOD = 50000
+## The number of messages the picture task sends each run
+MESSAGES = 4
+## The flusher's period in microseconds; it isn't a multiple of the other
+#  periods, so flushes fall at every point of the control period
+FLUSH_PERIOD = 107300
+
+
+def slow_print(*args, sep=' ', end='\n', **kwargs):
+    text = sep.join(str(arg) for arg in args) + end
+    until = time.perf_counter() + len(text) * CHAR_US / 1e6
+    while time.perf_counter() < until:
+        pass
+
+
+def run(deferred):
+    log = event_log.EventLog(level=event_log.DEBUG)
+    event = log.event("yaw datum {} desired {} current {}")
+    now = utime.ticks_us()
+    control_due = utime.ticks_add(now, CONTROL_PERIOD)
+    picture_due = now
+    flush_due = now
+    end = utime.ticks_add(now, DURATION * 1000000)
+    late = []
+    while utime.ticks_diff(end, utime.ticks_us()) > 0:
+        now = utime.ticks_us()
+        if utime.ticks_diff(now, control_due) >= 0:
+            late.append(utime.ticks_diff(now, control_due))
+            control_due = utime.ticks_add(control_due, CONTROL_PERIOD)
+        elif utime.ticks_diff(now, picture_due) >= 0:
+            picture_due = utime.ticks_add(picture_due, PICTURE_PERIOD)
+            for _ in range(MESSAGES):
+                if deferred:
+                    log.log(event, 123, 4567, 4000)
+                else:
+                    print('datum', 123, 'desired', 4567.8, 'current', 4000)
+        elif deferred and utime.ticks_diff(now, flush_due) >= 0:
+            flush_due = utime.ticks_add(flush_due, FLUSH_PERIOD)
+            log.flush(2000)
+    return late
+
+
+def main():
+    real_print = builtins.print
+    builtins.print = slow_print
+    try:
+        results = [(name, run(deferred)) for name, deferred
+                   in (("print", False), ("deferred log", True))]
+    finally:
+        builtins.print = real_print
+    print(f"{'mode':14s}{'p50 us':>8s}{'p95 us':>8s}{'max us':>8s}")
+    for name, late in results:
+        print(f"{name:14s}{percentile(late, 50):8d}{percentile(late, 95):8d}{max(late):8d}")
+
+
+if __name__ == "__main__":
+    main()
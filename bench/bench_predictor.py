@@ -0,0 +1,72 @@
+"""!
+@file bench_predictor.py
+This file simulates aiming at a moving target with and without the
+AlphaBetaPredictor of @c target_predictor.py.
+
+As on the turret, a new target position arrives from the camera every
+@c IMAGE_PERIOD, @c LATENCY after the image was taken, while the control
+tasks update their setpoint every @c CONTROL_PERIOD. Without prediction the
+setpoint holds the latest measurement; with it, the predicted motion since
+that measurement is added, as @c yawTask does. The error is the distance
+from the setpoint to the true target position at each control update.
+The predictor is run twice: with each measurement given the time it
+arrives, as @c pictureTask does, and with the time its image was taken, so
+that it also makes up for the latency.
+Time is simulated, so the results don't depend on the speed of the PC.
+"""
+
+import math
+from target_predictor import AlphaBetaPredictor
+
+## Time between camera images in microseconds
+IMAGE_PERIOD = 500000
+## Delay from an image being taken to its position reaching the tasks
+LATENCY = 250000
+## Time between control updates in microseconds
+CONTROL_PERIOD = 40000
+## Simulated time for each target in microseconds
+DURATION = 20000000
+
+## Target positions in encoder ticks as functions of time in seconds
+TARGETS = (
+    ("constant velocity", lambda t: 1500.0 * t),
+    ("slow sinusoid", lambda t: 3000.0 * math.sin(2 * math.pi * t / 8.0)),
+    ("fast sinusoid", lambda t: 3000.0 * math.sin(2 * math.pi * t / 2.0)),
+)
+
+
+def simulate(position, predict, stamp_taken=False):
+    predictor = AlphaBetaPredictor()
+    measured = None
+    next_image = LATENCY
+    total = 0.0
+    count = 0
+    for t_us in range(0, DURATION, CONTROL_PERIOD):
+        while t_us >= next_image:
+            # The image was taken LATENCY ago; its position arrives now
+            taken = next_image - LATENCY
+            measured = position(taken / 1e6)
+            predictor.measure(measured, taken if stamp_taken else next_image)
+            next_image += IMAGE_PERIOD
+        if measured is None:
+            continue
+        setpoint = measured
+        if predict:
+            setpoint += predictor.offset(t_us)
+        total += abs(setpoint - position(t_us / 1e6))
+        count += 1
+    return total / count
+
+
+def main():
+    print("mean aim error in ticks")
+    print(f"{'target':20s}{'hold':>8s}{'predict':>10s}{'predict, taken time':>22s}")
+    for name, position in TARGETS:
+        hold = simulate(position, False)
+        arrival = simulate(position, True)
+        taken = simulate(position, True, stamp_taken=True)
+        print(f"{name:20s}{hold:8.0f}{arrival:10.0f}{taken:22.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""!
+@file bench_queue.py
+This file measures the cost per item of moving data through a
+task_share.Queue one item at a time and in blocks with put_many() and
+get_many(), and checks that the block transfers keep the items in order
+across the end of the ring buffer.
+"""
+
+import array
+import pyb
+import task_share
+from benchlib import time_per_call
+
+## Items moved per timed run
+ITEMS = 3200
+## Items in each block
+BLOCK = 32
+## Slots in the queue
+SIZE = 64
+
+
+def check():
+    queue = task_share.Queue('h', SIZE, thread_protect=True)
+    queue.put_many(array.array('h', range(50)), 'h')
+    queue.get_many(array.array('h', range(40)), 'h')
+    # 10 items are left; 54 more fill the queue, wrapping past its end
+    if queue.put_many(array.array('h', range(100, 160)), 'h') != SIZE - 10:
+        raise AssertionError("put_many() should stop when the queue is full")
+    out = array.array('h', range(SIZE))
+    if queue.get_many(out, 'h') != SIZE or list(out) != list(range(40, 50)) + list(range(100, 154)):
+        raise AssertionError("get_many() returned the wrong items")
+    # Blocks of another type, or of no stated type, are copied item by item
+    if queue.put_many(array.array('l', [1, 2]), 'l') != 2 or not pyb._irq_enabled:
+        raise AssertionError("put_many() failed on a block of another type")
+    if queue.put_many([3, 4]) != 2:
+        raise AssertionError("put_many() failed on a list")
+    out = [0] * 8
+    if queue.get_many(out) != 4 or out[:4] != [1, 2, 3, 4]:
+        raise AssertionError("get_many() failed on a list")
+
+
+def main():
+    check()
+    queue = task_share.Queue('h', SIZE, thread_protect=True)
+    block = array.array('h', range(BLOCK))
+    out = array.array('h', range(BLOCK))
+
+    def single():
+        for _ in range(ITEMS // BLOCK):
+            for item in range(BLOCK):
+                queue.put(item)
+            for _ in range(BLOCK):
+                queue.get()
+
+    def non_blocking():
+        for _ in range(ITEMS // BLOCK):
+            for item in range(BLOCK):
+                queue.try_put(item)
+            for _ in range(BLOCK):
+                queue.try_get()
+
+    def bulk():
+        for _ in range(ITEMS // BLOCK):
+            queue.put_many(block, 'h')
+            queue.get_many(out, 'h')
+
+    print(f"{'transfer':26s}{'ns/item':>9s}")
+    for name, fn in (("put/get", single), ("try_put/try_get", non_blocking),
+                     (f"put_many/get_many ({BLOCK})", bulk)):
+        ns = time_per_call(fn, calls=5) * 1000 / ITEMS
+        print(f"{name:26s}{ns:9.0f}")
+
+
+if __name__ == "__main__":
+    main()
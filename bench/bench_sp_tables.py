@@ -0,0 +1,36 @@
+"""!
+@file bench_sp_tables.py
+This file compares iterating a subpage's pixel indices with the cached
+index tables of the read patterns against the generator they replaced,
+which ran get_sp() over all 768 pixels on every call.
+"""
+
+from benchlib import time_per_call
+from mlx90640.image import ChessPattern, InterleavedPattern
+
+
+def generator_sp_range(pattern, sp_id):
+    # The original _BasePattern.sp_range()
+    return (idx for idx, sp in enumerate(pattern.iter_sp()) if sp == sp_id)
+
+
+def iterate(indices):
+    total = 0
+    for idx in indices:
+        total += idx
+    return total
+
+
+def main():
+    print(f"{'pattern':20s}{'generator us':>14s}{'table us':>10s}")
+    for pattern in (ChessPattern, InterleavedPattern):
+        for sp_id in (0, 1):
+            if list(generator_sp_range(pattern, sp_id)) != list(pattern.sp_range(sp_id)):
+                raise AssertionError(f"{pattern.__name__} subpage {sp_id} differs")
+        old = time_per_call(lambda: iterate(generator_sp_range(pattern, 0)))
+        new = time_per_call(lambda: iterate(pattern.sp_range(0)))
+        print(f"{pattern.__name__:20s}{old:14.0f}{new:10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+"""!
+@file bench_wakeups.py
+This file compares a task which polls a share on a fixed period with one
+which subscribes to the share and runs only when its value changes.
+
+A producer task flips an on-target flag at random intervals of 100 to
+400 ms. The consumer either runs every 100 ms, as the Fire Task did, or
+has no period and is woken by @c Share.subscribe(task, on_change=True).
+The reaction time is from the write to the consumer seeing the new value.
+The tasks are run by @c deadline_sched(), with @c pyb.wfi() imitated by
+sleeping until the next whole millisecond.
+"""
+
+import random
+import time
+import utime
+import cotask
+import task_share
+from benchlib import percentile
+
+## Seconds to run each design
+DURATION = 5
+## The polling consumer's period in milliseconds
+POLL_PERIOD = 100
+
+
+def systick_wfi():
+    time.sleep(0.001 - time.perf_counter() % 0.001)
+
+
+def run(event_driven):
+    random.seed(4)
+    tasks = cotask.TaskList()
+    share = task_share.Share('b', thread_protect=False, name="On Target")
+    written = [None]
+    reactions = []
+    runs = [0]
+
+    def consumer():
+        last = 0
+        while True:
+            runs[0] += 1
+            value = share.get()
+            if value != last:
+                reactions.append(utime.ticks_diff(utime.ticks_us(), written[0]))
+                last = value
+            yield 0
+
+    def producer():
+        due = utime.ticks_us()
+        value = 0
+        while True:
+            if utime.ticks_diff(utime.ticks_us(), due) >= 0:
+                value ^= 1
+                written[0] = utime.ticks_us()
+                share.put(value)
+                due = utime.ticks_add(due, random.randint(100000, 400000))
+            yield 0
+
+    task = cotask.Task(consumer, name="Consumer", priority=4,
+                       period=None if event_driven else POLL_PERIOD)
+    if event_driven:
+        share.subscribe(task, on_change=True)
+    tasks.append(task)
+    tasks.append(cotask.Task(producer, name="Producer", priority=2, period=5))
+
+    end = utime.ticks_add(utime.ticks_us(), DURATION * 1000000)
+    while utime.ticks_diff(end, utime.ticks_us()) > 0:
+        tasks.deadline_sched()
+    return runs[0], reactions
+
+
+def main():
+    cotask._wait = systick_wfi
+    print(f"{'consumer':14s}{'runs':>6s}{'changes':>9s}{'p50 ms':>9s}{'max ms':>9s}")
+    for name, event_driven in (("polled", False), ("event-driven", True)):
+        runs, reactions = run(event_driven)
+        print(f"{name:14s}{runs:6d}{len(reactions):9d}"
+              f"{percentile(reactions, 50) / 1000:9.2f}{max(reactions) / 1000:9.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""!
+@file bench_window_hotspot.py
+This file compares the summed-area-table WindowHotSpot with the original
+MLX_Cam.find_hotSpot() for speed and for how close each lands to a warm
+target, on synthetic frames of a round target at a random fractional
+position with noise added.
+
+Errors are distances in pixels from the target's true centre, in the
+mirrored coordinates the detectors return.
+"""
+
+import math
+import random
+from types import SimpleNamespace
+from benchlib import time_per_call
+from hotspot import WindowHotSpot
+from mlx90640.calibration import NUM_ROWS, NUM_COLS, IMAGE_SIZE
+from mlx90640.emulator import HotSpotScene
+from mlx90640.utils import array_filled
+from mlx_cam import MLX_Cam
+
+## The number of synthetic frames
+FRAMES = 200
+## Standard deviation of the pixel noise in raw counts
+NOISE = 20
+
+
+def make_frames():
+    random.seed(11)
+    frames = []
+    for _ in range(FRAMES):
+        x = random.uniform(3.0, NUM_COLS - 4.0)
+        y = random.uniform(2.0, NUM_ROWS - 3.0)
+        pix = array_filled('h', IMAGE_SIZE)
+        HotSpotScene(x=x, y=y, radius=1.2, peak=600)(0.0, pix)
+        for idx in range(IMAGE_SIZE):
+            pix[idx] += int(random.gauss(0, NOISE))
+        # The detectors give x from the left edge of the mirrored image, with
+        # pixel n spanning n to n + 1, and y as a row number
+        frames.append((pix, NUM_COLS - 0.5 - x, y))
+    return frames
+
+
+def evaluate(name, find, frames):
+    errors = []
+    for pix, x, y in frames:
+        found_x, found_y = find(pix)
+        errors.append(math.hypot(found_x - x, found_y - y))
+    us = sum(time_per_call(lambda: find(pix), calls=5, repeat=1)
+             for pix, _, _ in frames[:20]) / 20
+    print(f"{name:22s}{us:10.0f}{sum(errors) / len(errors):14.2f}{max(errors):12.2f}")
+
+
+def main():
+    frames = make_frames()
+    camera = SimpleNamespace(_width=NUM_COLS, _height=NUM_ROWS)
+    print(f"{'detector':22s}{'us/frame':>10s}{'mean error px':>14s}{'max error':>12s}")
+    evaluate("find_hotSpot 1x4", lambda pix: MLX_Cam.find_hotSpot(camera, pix), frames)
+    for rows, cols in ((1, 4), (3, 3), (2, 2)):
+        detector = WindowHotSpot(rows, cols)
+        evaluate(f"WindowHotSpot {rows}x{cols}", detector.find, frames)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,45 @@
+"""!
+@file benchlib.py
+This file contains small timing helpers shared by the host benchmarks.
+
+The benchmarks run the unmodified drivers and tasks under CPython with the
+stand-ins in @c src/host. Run them from the repository root with
+
+    PYTHONPATH=src/host:src python3 bench/bench_burst_read.py
+
+The figures are for comparing one version of the code against another on
+the same PC; they are not the timings on the board.
+"""
+
+import time
+
+
+def time_per_call(fn, calls=100, repeat=5):
+    """!
+    Time a function, taking the best of several runs to hide noise.
+    @param   fn A function of no arguments
+    @param   calls The number of calls in each run
+    @param   repeat The number of runs
+    @returns The time of one call in microseconds
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(calls):
+            fn()
+        elapsed = time.perf_counter() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best * 1e6 / calls
+
+
+def percentile(values, p):
+    """!
+    Find a percentile of a list of numbers by the nearest rank.
+    @param   values The numbers, in any order
+    @param   p The percentile, from 0 to 100
+    @returns The value below which @c p percent of the numbers lie
+    """
+    ordered = sorted(values)
+    idx = min(len(ordered) - 1, int(len(ordered) * p / 100))
+    return ordered[idx]
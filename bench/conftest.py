@@ -0,0 +1,25 @@
+"""!
+@file conftest.py
+This file lets pytest run the checks in this directory without setting
+@c PYTHONPATH by hand.
+
+It puts the MicroPython stand-ins in @c src/host and the project code in
+@c src on the module search path, then loads the stand-ins' start-up file
+as CPython would have done had they been on the path from the start.
+"""
+
+import builtins
+import os
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+for _path in ("src", os.path.join("src", "host")):
+    _path = os.path.join(_ROOT, _path)
+    if _path not in sys.path:
+        sys.path.insert(0, _path)
+
+if not hasattr(builtins, "const"):
+    import importlib.util
+    _spec = importlib.util.spec_from_file_location(
+        "sitecustomize", os.path.join(_ROOT, "src", "host", "sitecustomize.py"))
+    _spec.loader.exec_module(importlib.util.module_from_spec(_spec))
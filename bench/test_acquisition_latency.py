@@ -0,0 +1,103 @@
+"""!
+@file test_acquisition_latency.py
+This file checks that acquiring camera frames from a cotask task doesn't
+hold up a control task running beside it.
+
+An emulated camera is attached to the host I2C bus, and the picture task of
+@c main.py is imitated at its priority and period, either by polling with
+@c MLX_Cam.poll() or by blocking in @c MLX_Cam.get_image() as before. A
+40 ms control task like the yaw and pitch tasks records when each of its
+runs starts, and the tasks are run by @c deadline_sched() as in
+@c main.py. Under cooperative scheduling a control run can always have to
+wait for one run of the picture task, so while polling no control run may
+be later than the longest call to @c poll() plus @c MARGIN_MS, which
+covers the scheduler and the PC. Run it with pytest, or on its own to
+compare the two ways of acquiring frames:
+
+    python3 -m pytest bench/test_acquisition_latency.py
+    PYTHONPATH=src/host:src python3 bench/test_acquisition_latency.py
+"""
+
+import utime
+import cotask
+from machine import I2C
+from benchlib import percentile
+from mlx90640.emulator import EmulatedCamera, HotSpotScene
+from mlx_cam import MLX_Cam
+
+## The run time in seconds of each mode
+DURATION = 3
+## The control task's period in milliseconds, as for the yaw and pitch tasks
+CONTROL_PERIOD = 40
+## How much later than the longest picture task run a control run may be,
+#  in milliseconds
+MARGIN_MS = 5
+
+
+def run(blocking):
+    """!
+    Run the control and picture tasks for @c DURATION seconds.
+    @param   blocking @c True to acquire with @c get_image(), @c False to poll
+    @returns The number of frames acquired, how late each control run was
+             and the longest call to acquire a frame, both in microseconds
+    """
+    I2C.devices[1] = EmulatedCamera(HotSpotScene(vx=2.0))
+    camera = MLX_Cam(I2C(1))
+    frames = [0]
+    longest = [0]
+    starts = []
+
+    def control():
+        while True:
+            starts.append(utime.ticks_us())
+            yield 0
+
+    def picture():
+        while True:
+            call_start = utime.ticks_us()
+            image = camera.get_image() if blocking else camera.poll()
+            call_us = utime.ticks_diff(utime.ticks_us(), call_start)
+            if call_us > longest[0]:
+                longest[0] = call_us
+            if image is not None:
+                frames[0] += 1
+            yield 0
+
+    tasks = cotask.TaskList()
+    tasks.append(cotask.Task(control, name="Control", priority=2,
+                             period=CONTROL_PERIOD))
+    tasks.append(cotask.Task(picture, name="Picture", priority=5, period=50))
+    start = utime.ticks_us()
+    end = utime.ticks_add(start, DURATION * 1000000)
+    while utime.ticks_diff(end, utime.ticks_us()) > 0:
+        tasks.deadline_sched()
+
+    # A control run is late by however much longer than a period it came
+    # after the previous one; the end of the test counts as a run, so a task
+    # which never gets to run again shows up as late
+    starts.append(utime.ticks_us())
+    late = [max(0, utime.ticks_diff(starts[idx], starts[idx - 1]) - CONTROL_PERIOD * 1000)
+            for idx in range(1, len(starts))]
+    return frames[0], late, longest[0]
+
+
+def test_poll_keeps_control_latency_bounded():
+    frames, late, longest = run(blocking=False)
+    assert frames > 0, "polling acquired no frames"
+    assert max(late) <= longest + MARGIN_MS * 1000, \
+        f"a control run was {max(late) / 1000:.2f} ms late; the longest poll took {longest / 1000:.2f} ms"
+
+
+def main():
+    print(f"{'picture task':14s}{'frames':>8s}{'late p50 ms':>13s}"
+          f"{'late max ms':>13s}{'longest call ms':>17s}")
+    for name, blocking in (("get_image", True), ("poll", False)):
+        frames, late, longest = run(blocking)
+        print(f"{name:14s}{frames:8d}{percentile(late, 50) / 1000:13.2f}"
+              f"{max(late) / 1000:13.2f}{longest / 1000:17.2f}")
+    test_poll_keeps_control_latency_bounded()
+    print("ok")
+
+
+if __name__ == "__main__":
+    main()
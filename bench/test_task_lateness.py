@@ -0,0 +1,101 @@
+"""!
+@file test_task_lateness.py
+This file checks how @c cotask counts lateness and missed deadlines under
+both of its priority schedulers.
+
+Run it with pytest from the repository root:
+
+    python3 -m pytest bench
+"""
+
+import utime
+import cotask
+
+## The period in milliseconds of the timed task in each check
+PERIOD = 10
+
+
+def idle_task():
+    while True:
+        yield 0
+
+
+def make_list(task):
+    tasks = cotask.TaskList()
+    tasks.append(task)
+    return tasks
+
+
+def scheduler(tasks, mode):
+    return tasks.pri_sched if mode == "pri_sched" else tasks.deadline_sched
+
+
+def check_overdue(mode):
+    # A task left 1.6 periods behind, then scheduled once, has missed one
+    # release and is late by 1.6 periods from the first one it missed
+    task = cotask.Task(idle_task, name="Late", priority=1, period=PERIOD,
+                       profile=True)
+    tasks = make_list(task)
+    task._next_run = utime.ticks_add(utime.ticks_us(), -16 * PERIOD * 100)
+    scheduler(tasks, mode)()
+
+    assert task._runs == 1
+    assert task._releases == 1
+    assert task.misses == 1
+    assert 16 * PERIOD * 100 <= task._latest < 20 * PERIOD * 100
+
+    # The next release is the first run time after now, not a missed one
+    assert utime.ticks_diff(task._next_run, utime.ticks_us()) > 0
+
+
+def test_overdue_pri_sched():
+    check_overdue("pri_sched")
+
+
+def test_overdue_deadline_sched():
+    check_overdue("deadline_sched")
+
+
+def stalling_task(stall_run, stall_us):
+    # Runs at once each time, except for one run which takes a long time
+    def run():
+        runs = 0
+        while True:
+            runs += 1
+            if runs == stall_run:
+                until = utime.ticks_add(utime.ticks_us(), stall_us)
+                while utime.ticks_diff(until, utime.ticks_us()) > 0:
+                    pass
+            yield 0
+    return run
+
+
+def check_profile(mode):
+    # One run takes 2.5 periods, so the next run starts about 1.5 periods
+    # after its release; that's one miss, and it's the worst lateness
+    task = cotask.Task(stalling_task(5, 25 * PERIOD * 100), name="Stall",
+                       priority=1, period=PERIOD, profile=True)
+    tasks = make_list(task)
+    sched = scheduler(tasks, mode)
+    end = utime.ticks_add(utime.ticks_us(), 20 * PERIOD * 1000)
+    while utime.ticks_diff(end, utime.ticks_us()) > 0:
+        sched()
+
+    ((name, run, late, misses),) = tasks.percentiles((50, 95, 100))
+    assert name == "Stall"
+    assert misses == 1
+    assert task._releases == task._runs
+    assert late[0] < PERIOD * 100
+    assert 12 * PERIOD * 100 <= late[2] <= 20 * PERIOD * 100
+    assert run[2] >= 20 * PERIOD * 100
+
+    # Only the stalled run was late, so the average stays well under that
+    assert task._late_sum / task._releases < 2 * PERIOD * 100
+
+
+def test_profile_pri_sched():
+    check_profile("pri_sched")
+
+
+def test_profile_deadline_sched():
+    check_profile("deadline_sched")
@@ -0,0 +1,147 @@
+"""!
+@file aim_tables.py
+This file contains lookup tables which convert a hot spot position in the
+camera image into encoder ticks away from the turret's datum, so that the
+picture task can aim with two table lookups instead of trigonometry.
+
+The tables are built at startup from a model of the camera geometry, which
+can be adjusted or replaced by a calibration file written by
+@c fit_aim_tables.py.
+
+@author mecha12
+@date   17-Oct-2026
+"""
+
+import math
+from array import array
+from mlx90640.calibration import NUM_ROWS, NUM_COLS
+from hotspot import SUBPIXEL_BITS
+
+## The default camera geometry, which reproduces the original aiming formula
+GEOMETRY = {
+    'distance': 18.0,             # Distance to the target plane
+    'ticks_per_rad': 4000 / 3.14, # Encoder ticks per radian of turret motion
+    'yaw_centre': 16.0,           # Image x which is straight ahead
+    'yaw_scale': 0.25,            # Target plane distance per pixel across
+    'yaw_gain': 8.0,              # Gear ratio of the yaw axis
+    'pitch_centre': 0.0,          # Image y which is straight ahead
+    'pitch_scale': 0.75 * 3.7 / 12, # Target plane distance per pixel down
+    'pitch_gain': 1.0,            # Gear ratio of the pitch axis
+}
+
+
+def _lookup(table, pos_fp):
+    # Interpolate between the two nearest entries, extrapolating the end
+    # segments for positions outside the table
+    last = len(table) - 2
+    idx = pos_fp >> SUBPIXEL_BITS
+    if idx < 0:
+        idx = 0
+    elif idx > last:
+        idx = last
+    frac = pos_fp - (idx << SUBPIXEL_BITS)
+    low = table[idx]
+    return low + (((table[idx + 1] - low) * frac) >> SUBPIXEL_BITS)
+
+
+class AimTables:
+    """!
+    Per-column and per-row encoder tick offsets for aiming at a hot spot.
+
+    The yaw table has an entry for each image x and the pitch table for each
+    image y, in the mirrored coordinates of @c MLX_Cam.find_hotSpot().
+    Positions are fixed-point with @c SUBPIXEL_BITS fractional bits, as
+    produced by @c Centroid.refine(), and are interpolated between entries.
+    """
+
+    def __init__(self, filename=None, **geometry):
+        """!
+        Build the tables from the camera geometry.
+        @param   filename The name of a calibration file to load, or
+                 @c None to use the geometry alone
+        @param   geometry Values which override those in @c GEOMETRY
+        """
+        ## The geometry the tables were built from
+        self.geometry = dict(GEOMETRY)
+        self.geometry.update(geometry)
+        ## Encoder ticks from the yaw datum for each image x
+        self.yaw = array('l', [0] * NUM_COLS)
+        ## Encoder ticks from the pitch datum for each image y
+        self.pitch = array('l', [0] * NUM_ROWS)
+        if filename is None:
+            self.build()
+        else:
+            self.load(filename)
+
+    def build(self):
+        """!
+        Fill both tables from the geometry model.
+        """
+        geo = self.geometry
+        distance = geo['distance']
+        ticks = geo['ticks_per_rad']
+        for x in range(NUM_COLS):
+            offset = (x - geo['yaw_centre']) * geo['yaw_scale']
+            self.yaw[x] = round(geo['yaw_gain'] * ticks * math.atan(offset / distance))
+        for y in range(NUM_ROWS):
+            offset = (y - geo['pitch_centre']) * geo['pitch_scale']
+            self.pitch[y] = round(geo['pitch_gain'] * ticks * math.atan(offset / distance))
+
+    def load(self, filename):
+        """!
+        Read a calibration file and rebuild the tables.
+        @details Each line holds a name followed by values. Names from
+                 @c GEOMETRY set the geometry; the names @c yaw and
+                 @c pitch give a complete table, which replaces the one
+                 built from the geometry. Blank lines and lines starting
+                 with # are ignored.
+        @param   filename The name of the file
+        """
+        tables = {}
+        with open(filename, 'r') as file:
+            for line in file:
+                fields = line.split()
+                if not fields or fields[0].startswith('#'):
+                    continue
+                name = fields[0]
+                if name in ('yaw', 'pitch'):
+                    table = getattr(self, name)
+                    if len(fields) - 1 != len(table):
+                        raise ValueError(f"{name} table needs {len(table)} entries")
+                    tables[name] = [int(value) for value in fields[1:]]
+                elif name in GEOMETRY:
+                    self.geometry[name] = float(fields[1])
+                else:
+                    raise ValueError(f"unknown aim calibration entry: {name}")
+        self.build()
+        for name, values in tables.items():
+            table = getattr(self, name)
+            for idx, value in enumerate(values):
+                table[idx] = value
+
+    def save(self, filename):
+        """!
+        Write the geometry and both tables to a calibration file.
+        @param   filename The name of the file
+        """
+        with open(filename, 'w') as file:
+            for name in GEOMETRY:
+                file.write(f"{name} {self.geometry[name]}\n")
+            file.write("yaw " + " ".join(str(value) for value in self.yaw) + "\n")
+            file.write("pitch " + " ".join(str(value) for value in self.pitch) + "\n")
+
+    def yaw_ticks(self, x_fp):
+        """!
+        Find the yaw encoder ticks from the datum which aim at an image x.
+        @param   x_fp The fixed-point image x of the target
+        @returns The offset in encoder ticks
+        """
+        return _lookup(self.yaw, x_fp)
+
+    def pitch_ticks(self, y_fp):
+        """!
+        Find the pitch encoder ticks from the datum which aim at an image y.
+        @param   y_fp The fixed-point image y of the target
+        @returns The offset in encoder ticks
+        """
+        return _lookup(self.pitch, y_fp)
@@ -0,0 +1,306 @@
+"""!
+@file blob_tracker.py
+This file contains a blob extractor which finds every warm region in an
+image from the MLX90640 camera, and a tracker which follows those regions
+from frame to frame under stable track numbers.
+
+Both classes allocate all their storage when they are created, so that
+they can run in the picture task without fragmenting memory.
+
+@author mecha12
+@date   17-Oct-2026
+"""
+
+from array import array
+from mlx90640.calibration import NUM_ROWS, NUM_COLS, IMAGE_SIZE
+from mlx90640.utils import array_filled
+from hotspot import SUBPIXEL_BITS, fixed_point_ratio
+
+
+class BlobFinder:
+    """!
+    Finds connected regions of pixels above a threshold.
+
+    Pixels are labelled in a single raster pass with 8-connectivity: each
+    pixel above the threshold takes the label of an already labelled
+    neighbour to its left or above, and labels which meet are merged with a
+    union-find forest. Area, intensity-weighted centroid and peak are
+    accumulated per provisional label during the same pass and folded into
+    the root labels afterwards, so the image is only read once.
+    """
+
+    def __init__(self, threshold=100, min_area=2, max_labels=64):
+        """!
+        Allocate the label image, union-find forest and blob statistics.
+        @param   threshold Pixels above this value belong to blobs
+        @param   min_area Blobs with fewer pixels than this are dropped
+        @param   max_labels The most provisional labels in one image; pixels
+                 which would need more are left unlabelled and counted in
+                 @c overflow
+        """
+        self.threshold = threshold
+        self.min_area = min_area
+        self.max_labels = max_labels
+
+        # Label of each pixel, 0 for background; labels start at 1
+        self._labels = array_filled('B' if max_labels < 256 else 'H', IMAGE_SIZE)
+        # Union-find parent of each label
+        self._parent = array_filled('H', max_labels + 1)
+
+        # Statistics per provisional label, merged into roots by find()
+        self._area = array_filled('H', max_labels + 1)
+        self._sum_w = array_filled('l', max_labels + 1)
+        self._sum_wx = array_filled('l', max_labels + 1)
+        self._sum_wy = array_filled('l', max_labels + 1)
+        self._peak = array_filled('h', max_labels + 1)
+
+        ## The number of blobs found by the last call to @c find()
+        self.count = 0
+        ## The number of pixels which ran out of labels in the last image
+        self.overflow = 0
+        ## Blob areas in pixels, for blobs 0 to @c count - 1
+        self.area = array_filled('H', max_labels)
+        ## Blob centroid x, mirrored like @c MLX_Cam.find_hotSpot(), fixed-point
+        self.x_fp = array_filled('l', max_labels)
+        ## Blob centroid y (row), fixed-point
+        self.y_fp = array_filled('l', max_labels)
+        ## Hottest pixel value in each blob
+        self.peak = array_filled('h', max_labels)
+
+    def _root(self, label):
+        parent = self._parent
+        while parent[label] != label:
+            # Path halving keeps the trees flat without recursion
+            parent[label] = parent[parent[label]]
+            label = parent[label]
+        return label
+
+    def _union(self, a, b):
+        a = self._root(a)
+        b = self._root(b)
+        if a < b:
+            self._parent[b] = a
+            return a
+        if b < a:
+            self._parent[a] = b
+        return b
+
+    def find(self, image):
+        """!
+        Label an image and collect the statistics of each blob.
+        @param   image A raw image or any sequence of 768 pixel values, such
+                 as the foreground image of a background model
+        @returns The number of blobs found, also kept in @c count
+        """
+        pix = getattr(image, 'pix', image)
+        labels = self._labels
+        parent = self._parent
+        area = self._area
+        sum_w = self._sum_w
+        sum_wx = self._sum_wx
+        sum_wy = self._sum_wy
+        peak = self._peak
+        threshold = self.threshold
+        max_labels = self.max_labels
+        next_label = 1
+        overflow = 0
+
+        for row in range(NUM_ROWS):
+            base = row * NUM_COLS
+            for col in range(NUM_COLS):
+                idx = base + col
+                value = pix[idx]
+                if value <= threshold:
+                    labels[idx] = 0
+                    continue
+
+                # Neighbours already visited: left, up-left, up, up-right
+                label = 0
+                if col > 0 and labels[idx - 1]:
+                    label = labels[idx - 1]
+                if row > 0:
+                    up = idx - NUM_COLS
+                    if col > 0 and labels[up - 1]:
+                        label = self._union(label, labels[up - 1]) if label else labels[up - 1]
+                    if labels[up]:
+                        label = self._union(label, labels[up]) if label else labels[up]
+                    if col < NUM_COLS - 1 and labels[up + 1]:
+                        label = self._union(label, labels[up + 1]) if label else labels[up + 1]
+
+                if not label:
+                    if next_label > max_labels:
+                        labels[idx] = 0
+                        overflow += 1
+                        continue
+                    label = next_label
+                    next_label += 1
+                    parent[label] = label
+                    area[label] = 0
+                    sum_w[label] = 0
+                    sum_wx[label] = 0
+                    sum_wy[label] = 0
+                    peak[label] = value
+
+                labels[idx] = label
+                weight = value - threshold
+                area[label] += 1
+                sum_w[label] += weight
+                sum_wx[label] += weight * col
+                sum_wy[label] += weight * row
+                if value > peak[label]:
+                    peak[label] = value
+
+        # Fold each provisional label's statistics into its root
+        for label in range(next_label - 1, 0, -1):
+            root = self._root(label)
+            if root != label:
+                area[root] += area[label]
+                sum_w[root] += sum_w[label]
+                sum_wx[root] += sum_wx[label]
+                sum_wy[root] += sum_wy[label]
+                if peak[label] > peak[root]:
+                    peak[root] = peak[label]
+                area[label] = 0
+
+        # Copy out the blobs which are large enough
+        count = 0
+        mirror = (NUM_COLS << SUBPIXEL_BITS) - (1 << (SUBPIXEL_BITS - 1))
+        for label in range(1, next_label):
+            if area[label] < self.min_area or parent[label] != label:
+                continue
+            self.area[count] = area[label]
+            self.x_fp[count] = mirror - fixed_point_ratio(sum_wx[label], sum_w[label])
+            self.y_fp[count] = fixed_point_ratio(sum_wy[label], sum_w[label])
+            self.peak[count] = peak[label]
+            count += 1
+
+        self.count = count
+        self.overflow = overflow
+        return count
+
+
+class TargetTracker:
+    """!
+    Follows blobs from frame to frame under stable track numbers.
+
+    Each update matches every live track to the nearest unclaimed blob
+    within a gating distance, oldest tracks first. Blobs left over start
+    new tracks and tracks which go unmatched for too many frames are
+    dropped. Track numbers are never reused while the tracker runs.
+    """
+
+    def __init__(self, max_tracks=4, gate=4, max_missed=3, max_blobs=64):
+        """!
+        Allocate the track table.
+        @param   max_tracks The most targets which are followed at once
+        @param   gate The farthest, in pixels, a target may move between
+                 updates and keep its track
+        @param   max_missed The number of updates a track survives without a
+                 matching blob
+        @param   max_blobs The most blobs passed in one update
+        """
+        self.max_tracks = max_tracks
+        self._gate_sq = (gate << SUBPIXEL_BITS) ** 2
+        self.max_missed = max_missed
+
+        ## Track number of each slot, 0 if the slot is free
+        self.track_id = array_filled('H', max_tracks)
+        ## Position of each track, in the fixed-point units of @c BlobFinder
+        self.x_fp = array_filled('l', max_tracks)
+        self.y_fp = array_filled('l', max_tracks)
+        ## Hottest pixel of each track's latest blob
+        self.peak = array_filled('h', max_tracks)
+        ## The number of updates each track has survived
+        self.age = array_filled('H', max_tracks)
+        # Updates since each track last matched a blob
+        self._missed = array_filled('B', max_tracks)
+        # Whether each blob has been claimed during an update
+        self._claimed = bytearray(max_blobs)
+
+        self._next_id = 1
+
+    def update(self, blobs):
+        """!
+        Match the blobs of a new image to the tracks.
+        @param   blobs A @c BlobFinder which has just run @c find()
+        @returns The number of live tracks
+        """
+        claimed = self._claimed
+        for blob in range(blobs.count):
+            claimed[blob] = 0
+
+        # Oldest tracks pick their blobs first so they keep their targets
+        for slot in self._slots_by_age():
+            best = -1
+            best_dist = self._gate_sq
+            x = self.x_fp[slot]
+            y = self.y_fp[slot]
+            for blob in range(blobs.count):
+                if claimed[blob]:
+                    continue
+                dx = blobs.x_fp[blob] - x
+                dy = blobs.y_fp[blob] - y
+                dist = dx * dx + dy * dy
+                if dist <= best_dist:
+                    best = blob
+                    best_dist = dist
+            if best < 0:
+                self._missed[slot] += 1
+                if self._missed[slot] > self.max_missed:
+                    self.track_id[slot] = 0
+                continue
+            claimed[best] = 1
+            self._assign(slot, blobs, best)
+            self._missed[slot] = 0
+            self.age[slot] += 1
+
+        # Unclaimed blobs start new tracks in free slots
+        for blob in range(blobs.count):
+            if claimed[blob]:
+                continue
+            for slot in range(self.max_tracks):
+                if not self.track_id[slot]:
+                    self.track_id[slot] = self._next_id
+                    self._next_id += 1
+                    self._assign(slot, blobs, blob)
+                    self._missed[slot] = 0
+                    self.age[slot] = 0
+                    break
+
+        live = 0
+        for slot in range(self.max_tracks):
+            if self.track_id[slot]:
+                live += 1
+        return live
+
+    def _assign(self, slot, blobs, blob):
+        self.x_fp[slot] = blobs.x_fp[blob]
+        self.y_fp[slot] = blobs.y_fp[blob]
+        self.peak[slot] = blobs.peak[blob]
+
+    def _slots_by_age(self):
+        # Track numbers grow with time, so the lowest number is the oldest
+        done = 0
+        while True:
+            best = -1
+            for slot in range(self.max_tracks):
+                track = self.track_id[slot]
+                if track > done and (best < 0 or track < self.track_id[best]):
+                    best = slot
+            if best < 0:
+                return
+            done = self.track_id[best]
+            yield best
+
+    def primary(self):
+        """!
+        Choose the track to aim at: the oldest one which was seen in the
+        latest update.
+        @returns A slot index into the track arrays, or -1 if there is none
+        """
+        best = -1
+        for slot in range(self.max_tracks):
+            if self.track_id[slot] and not self._missed[slot]:
+                if best < 0 or self.track_id[slot] < self.track_id[best]:
+                    best = slot
+        return best
@@ -28,10 +28,93 @@ ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
 SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 """
 
-import gc                              # Memory allocation garbage collector
+from array import array                # Preallocated profiling buffers
+from struct import pack                # Binary trace dumps
 import utime                           # Micropython version of time library
 import micropython                     # This shuts up incorrect warnings
 
+try:
+    from pyb import wfi as _wait       # Sleep until the next interrupt
+except ImportError:
+    from machine import idle as _wait
+
+## The number of buckets in each profiling histogram. Each power of two
+#  microseconds is split into four buckets, so a bucket's width is at most a
+#  quarter of its value; times of 1.8 seconds or more are all counted in the
+#  last bucket
+HIST_BUCKETS = const(80)
+
+
+@micropython.native
+def _hist_bucket(value):
+    """!
+    Find the histogram bucket for a time in microseconds.
+    @param value The time, which is treated as 0 if negative
+    @return The bucket index, from 0 to @c HIST_BUCKETS - 1
+    """
+    if value < 4:
+        return value if value > 0 else 0
+
+    # Find the position of the highest set bit by binary search
+    exp = 0
+    rest = value
+    if rest >= 0x10000:
+        rest >>= 16
+        exp += 16
+    if rest >= 0x100:
+        rest >>= 8
+        exp += 8
+    if rest >= 0x10:
+        rest >>= 4
+        exp += 4
+    if rest >= 0x4:
+        rest >>= 2
+        exp += 2
+    if rest >= 0x2:
+        exp += 1
+
+    # Four buckets per power of two, chosen by the two bits below the top
+    bucket = (exp - 1) * 4 + ((value >> (exp - 2)) & 3)
+    return bucket if bucket < HIST_BUCKETS else HIST_BUCKETS - 1
+
+
+def _hist_bounds(bucket):
+    """!
+    Find the range of times counted in a histogram bucket.
+    @param bucket The bucket index
+    @return A tuple of the lowest and highest times in microseconds
+    """
+    if bucket < 4:
+        return bucket, bucket
+    exp = bucket // 4 + 1
+    low = (4 + bucket % 4) << (exp - 2)
+    return low, low + (1 << (exp - 2)) - 1
+
+
+def _hist_percentile(hist, percent):
+    """!
+    Estimate a percentile from a histogram, interpolating within the bucket
+    in which it falls.
+    @param hist The histogram
+    @param percent The percentile, from 0 to 100
+    @return The estimated time in microseconds, or @c None if the histogram
+            is empty
+    """
+    total = 0
+    for count in hist:
+        total += count
+    if total == 0:
+        return None
+    rank = percent * total / 100
+    seen = 0
+    for bucket in range(HIST_BUCKETS):
+        count = hist[bucket]
+        if count and seen + count >= rank:
+            low, high = _hist_bounds(bucket)
+            return low + (high - low) * (rank - seen) / count
+        seen += count
+    return _hist_bounds(HIST_BUCKETS - 1)[0]
+
 
 class Task:
     """!
@@ -70,7 +153,7 @@ class Task:
 
 
     def __init__(self, run_fun, name="NoName", priority=0, period=None,
-                 profile=False, trace=False, shares=()):
+                 profile=False, trace=False, shares=(), trace_size=128):
         """!
         Initialize a task object so it may be run by the scheduler.
 
@@ -88,10 +171,12 @@ class Task:
                The time can be given in a @c float or @c int; it will be 
                converted to microseconds for internal use by the scheduler.
         @param profile Set to @c True to enable run-time profiling 
-        @param trace Set to @c True to generate a list of transitions between
-               states. @b Note: This slows things down and allocates memory.
+        @param trace Set to @c True to record transitions between states.
+               States must be integers; a state of @c None is recorded as -1
         @param shares A list or tuple of shares and queues used by this task.
                If no list is given, no shares are passed to the task
+        @param trace_size The number of the most recent transitions which
+               are kept when tracing; older ones are overwritten
         """
         # The function which is run to implement this task's code. Since it 
         # is a generator, we "run" it here, which doesn't actually run it but
@@ -129,16 +214,36 @@ class Task:
         # for and track state transitions.
         self._prev_state = 0
 
-        # If transition tracing has been enabled, create an empty list in 
-        # which to store transition (time, to-state) stamps
+        # If transition tracing has been enabled, create a ring buffer in
+        # which to store (time since previous transition, to-state) pairs.
+        # When it's full the oldest pair is overwritten, its time added to
+        # the base time and its state kept as the base state, so the trace
+        # still shows true times and the state it starts from. The base time
+        # is kept in whole seconds and microseconds so that neither becomes
+        # a long integer, which would allocate memory at every overwrite
         self._trace = trace
-        self._tr_data = []
+        self._tr_size = trace_size if trace else 0
+        self._tr_data = array('i', [0] * (2 * self._tr_size))
+        self._tr_next = 0
+        self._tr_count = 0
+        self._tr_base_s = 0
+        self._tr_base_us = 0
+        self._tr_base_state = 0
         self._prev_time = utime.ticks_us()
 
+        ## The number of trace entries which have been overwritten
+        self.trace_dropped = 0
+
         ## Flag which is set true when the task is ready to be run by the
         #  scheduler
         self.go_flag = False
 
+        # Flag which is set when the timer, rather than a call to go(), has
+        # released the task, so that only such runs count as late, and the
+        # time at which it was released
+        self._released = False
+        self._release = 0
+
 
     def schedule(self) -> bool:
         """!
@@ -150,50 +255,91 @@ class Task:
         @return @c True if the task ran or @c False if it did not
         """
         if self.ready():
+            self._run()
+            return True
+        else:
+            return False
 
-            # Reset the go flag for the next run
-            self.go_flag = False
-
-            # If profiling, save the start time
-            if self._prof:
-                stime = utime.ticks_us()
-
-            # Run the method belonging to the state which should be run next
-            curr_state = next(self._run_gen)
-
-            # If profiling or tracing, save timing data
-            if self._prof or self._trace:
-                etime = utime.ticks_us()
-
-            # If profiling, save timing data
-            if self._prof:
-                self._runs += 1
-                runt = utime.ticks_diff(etime, stime)
-                if self._runs > 2:
-                    self._run_sum += runt
-                    if runt > self._slowest:
-                        self._slowest = runt
-
-            # If transition logic tracing is on, record a transition; if not,
-            # ignore the state. If out of memory, switch tracing off and 
-            # run the memory allocation garbage collector
-            if self._trace:
-                try:
-                    if curr_state != self._prev_state:
-                        self._tr_data.append(
-                            (utime.ticks_diff(etime, self._prev_time),
-                             curr_state))
-                except MemoryError:
-                    self._trace = False
-                    gc.collect()
 
+    def _run(self):
+        """!
+        Run the task's generator up to its next @c yield() and record the
+        profiling and tracing data. The scheduler calls this once it has
+        decided that the task is ready.
+        """
+        # Reset the go flag for the next run
+        self.go_flag = False
+        released = self._released
+        self._released = False
+
+        # If profiling, save the start time and how long after its release
+        # time a timed task started. Each whole period of lateness is a
+        # release which never got a run of its own, so it's counted as a
+        # missed deadline. A run caused by go() has no release time, so it
+        # isn't counted
+        if self._prof:
+            stime = utime.ticks_us()
+            if released and self.period != None:
+                late = utime.ticks_diff(stime, self._release)
+                self._misses += late // self.period
+                self._releases += 1
+                self._late_sum += late
+                if late > self._latest:
+                    self._latest = late
+                self._late_hist[_hist_bucket(late)] += 1
+
+        # Run the method belonging to the state which should be run next
+        curr_state = next(self._run_gen)
+
+        # If profiling or tracing, save timing data
+        if self._prof or self._trace:
+            etime = utime.ticks_us()
+
+        # If profiling, save timing data
+        if self._prof:
+            self._runs += 1
+            runt = utime.ticks_diff(etime, stime)
+            if self._runs > 2:
+                self._run_sum += runt
+                if runt > self._slowest:
+                    self._slowest = runt
+                self._run_hist[_hist_bucket(runt)] += 1
+
+        # If transition logic tracing is on, record a transition; if not,
+        # ignore the state
+        if self._trace:
+            if curr_state == None:
+                curr_state = -1
+            if curr_state != self._prev_state:
+                self._trace_add(utime.ticks_diff(etime, self._prev_time),
+                                curr_state)
                 self._prev_state = curr_state
                 self._prev_time = etime
 
-            return True
 
+    @micropython.native
+    def _trace_add(self, delta, state):
+        """!
+        Put a transition into the trace ring buffer, overwriting the oldest
+        one if the buffer is full.
+        @param delta The time in microseconds since the previous transition
+        @param state The state to which the task went
+        """
+        data = self._tr_data
+        slot = 2 * self._tr_next
+        if self._tr_count < self._tr_size:
+            self._tr_count += 1
         else:
-            return False
+            base_us = self._tr_base_us + data[slot]
+            self._tr_base_s += base_us // 1000000
+            self._tr_base_us = base_us % 1000000
+            self._tr_base_state = data[slot + 1]
+            self.trace_dropped += 1
+        data[slot] = delta
+        data[slot + 1] = state
+        self._tr_next += 1
+        if self._tr_next >= self._tr_size:
+            self._tr_next = 0
 
 
     @micropython.native
@@ -205,25 +351,38 @@ class Task:
         go. This method may be overridden in descendent classes to implement
         some other behavior.
         """
-        # If this task uses a timer, check if it's time to run run() again. If
-        # so, set go flag and set the timer to go off at the next run time
+        # If this task uses a timer, check if it's time to run run() again
         if self.period != None:
-            late = utime.ticks_diff(utime.ticks_us(), self._next_run)
-            if late > 0:
-                self.go_flag = True
-                self._next_run = utime.ticks_diff(self.period, 
-                                                  -self._next_run)
-
-                # If keeping a latency profile, record the data
-                if self._prof:
-                    self._late_sum += late
-                    if late > self._latest:
-                        self._latest = late
+            self._due(utime.ticks_us())
 
         # If the task doesn't use a timer, we rely on go_flag to signal ready
         return self.go_flag
 
 
+    @micropython.native
+    def _due(self, now) -> bool:
+        """!
+        Check a timed task against the time @c now. If its time has come,
+        set the go flag and set the timer to go off at the first run time
+        after @c now. Run times which have already gone by are skipped in
+        one step, so a task which has fallen behind is released only once.
+        @param now The time from @c utime.ticks_us()
+        @return @c True if the task's time had come
+        """
+        late = utime.ticks_diff(now, self._next_run)
+        if late > 0:
+            # Lateness is measured from the earliest release which hasn't
+            # been run yet
+            if not self._released:
+                self._release = self._next_run
+            self.go_flag = True
+            self._released = True
+            self._next_run = utime.ticks_add(self._next_run,
+                (late // self.period + 1) * self.period)
+            return True
+        return False
+
+
     def set_period(self, new_period):
         """!
         This method sets the period between runs of the task to the given
@@ -245,8 +404,42 @@ class Task:
         self._runs = 0
         self._run_sum = 0
         self._slowest = 0
+        self._releases = 0
         self._late_sum = 0
         self._latest = 0
+        self._misses = 0
+
+        # Histograms of run durations and of start times after release, in
+        # microseconds. They're allocated once and cleared in place
+        if not hasattr(self, '_run_hist'):
+            self._run_hist = array('L', [0] * HIST_BUCKETS)
+            self._late_hist = array('L', [0] * HIST_BUCKETS)
+        for bucket in range(HIST_BUCKETS):
+            self._run_hist[bucket] = 0
+            self._late_hist[bucket] = 0
+
+
+    def percentile(self, percent, late=False):
+        """!
+        Estimate a percentile of the task's run duration or, for a timed
+        task, of how long after its scheduled time it started to run.
+        Profiling must be enabled.
+        @param percent The percentile, from 0 to 100
+        @param late Set to @c True for the lateness rather than the duration
+        @return The estimated time in microseconds, or @c None if there is no
+                data yet
+        """
+        return _hist_percentile(self._late_hist if late else self._run_hist,
+                                percent)
+
+
+    @property
+    def misses(self):
+        """!
+        The number of runs the task missed by starting a whole period or
+        more after its scheduled time; each whole period late is one miss.
+        """
+        return self._misses
 
 
     def get_trace(self):
@@ -259,18 +452,52 @@ class Task:
         tr_str = 'Task ' + self.name + ':'
         if self._trace:
             tr_str += '\n'
-            last_state = 0
-            total_time = 0.0
-            for item in self._tr_data:
-                total_time += item[0] / 1000000.0
+            if self.trace_dropped:
+                tr_str += f"({self.trace_dropped} earlier transitions overwritten)\n"
+            last_state = self._tr_base_state
+            total_time = self._tr_base_s + self._tr_base_us / 1000000.0
+            data = self._tr_data
+            slot = self._tr_next - self._tr_count
+            if slot < 0:
+                slot += self._tr_size
+            for _ in range(self._tr_count):
+                total_time += data[2 * slot] / 1000000.0
                 tr_str += '{: 12.6f}: {: 2d} -> {:d}\n'.format (total_time, 
-                    last_state, item[1])
-                last_state = item[1]
+                    last_state, data[2 * slot + 1])
+                last_state = data[2 * slot + 1]
+                slot += 1
+                if slot >= self._tr_size:
+                    slot = 0
         else:
             tr_str += ' not traced'
         return tr_str
 
 
+    def dump_trace(self, stream):
+        """!
+        Write the task's transition trace to a file or other stream in
+        binary form, without formatting it.
+
+        The dump is a 24 byte little-endian header of the magic bytes
+        @c CTTR, a version number (H), the number of entries (H), the number
+        of overwritten entries (I), the base time in whole seconds (I) and
+        microseconds (I) and the base state (i); then the entries from oldest to newest, each a
+        pair of 32-bit signed integers holding the time in microseconds
+        since the previous transition and the new state.
+        @param stream An object with a @c write() method, such as a file
+        """
+        stream.write(pack('<4sHHIIIi', b'CTTR', 2, self._tr_count,
+                          self.trace_dropped, self._tr_base_s,
+                          self._tr_base_us, self._tr_base_state))
+        view = memoryview(self._tr_data)
+        first = self._tr_next - self._tr_count
+        if first < 0:
+            # The oldest entries are at the end of the buffer
+            stream.write(view[2 * (first + self._tr_size):])
+            first = 0
+        stream.write(view[2 * first : 2 * self._tr_next])
+
+
     def go(self):
         """!
         Method to set a flag so that this task indicates that it's ready to run.
@@ -295,9 +522,9 @@ class Task:
 
         if self._prof and self._runs > 0:
             avg_dur = (self._run_sum / self._runs) / 1000.0
-            avg_late = (self._late_sum / self._runs) / 1000.0
             rst += f"{avg_dur: 10.3f}{(self._slowest / 1000.0): 10.3f}"
-            if self.period != None:
+            if self.period != None and self._releases > 0:
+                avg_late = (self._late_sum / self._releases) / 1000.0
                 rst += f"{avg_late: 10.3f}{(self._latest / 1000.0): 10.3f}"
         return rst
 
@@ -330,6 +557,21 @@ class TaskList:
         #  that priority. 
         self.pri_list = []
 
+        # Every task, and the timed tasks sorted by their next run time, for
+        # use by the deadline scheduler
+        self._tasks = []
+        self._timers = []
+
+        ## Time in microseconds which @c deadline_sched() has spent waiting
+        #  because no task was ready to run
+        self.idle_us = 0
+
+        ## When the next deadline is closer than this many microseconds,
+        #  @c deadline_sched() waits by polling the time rather than sleeping
+        #  until an interrupt; the system tick wakes the processor only once
+        #  per millisecond
+        self.spin_us = 1000
+
 
     def append(self, task):
         """!
@@ -357,6 +599,24 @@ class TaskList:
         # Make sure the main list (of lists at each priority) is sorted
         self.pri_list.sort(key=lambda pri: pri[0], reverse=True)
 
+        self._tasks.append(task)
+        if task.period != None:
+            self._add_timer(task)
+
+
+    def _add_timer(self, task):
+        """!
+        Insert a timed task into the list of timers, which is kept sorted by
+        next run time so that the first timer is the next one due.
+        @param task The task to be inserted
+        """
+        timers = self._timers
+        idx = 0
+        while idx < len(timers) and utime.ticks_diff(
+                timers[idx]._next_run, task._next_run) <= 0:
+            idx += 1
+        timers.insert(idx, task)
+
 
     @micropython.native
     def rr_sched(self):
@@ -403,6 +663,130 @@ class TaskList:
                     return
 
 
+    def deadline_sched(self):
+        """!
+        Run tasks according to their priorities, sleeping when none is ready.
+
+        This scheduler runs the same tasks in the same order as
+        @c pri_sched(), but it doesn't ask every task whether it's ready.
+        Timed tasks are kept in a list sorted by next run time, so only the
+        timers which are due are looked at. If no task is ready, the
+        processor sleeps until the next timer is due or an interrupt calls
+        a task's @c go() method. Tasks should be given their periods before
+        they're appended to the list; a task whose period is set to @c None
+        later is only run by @c go().
+
+        @return @c True if a task ran or @c False if the scheduler waited
+        """
+        now = utime.ticks_us()
+
+        # Set the go flags of the timed tasks whose time has come and put
+        # them back in the timer list at their next run times
+        timers = self._timers
+        while timers:
+            task = timers[0]
+            if task.period == None:
+                timers.pop(0)
+            elif task._due(now):
+                timers.pop(0)
+                self._add_timer(task)
+            else:
+                break
+
+        # Run the highest priority task which is ready, round-robin within
+        # each priority as in pri_sched()
+        for pri in self.pri_list:
+            length = len(pri)
+            tries = 2
+            while tries < length:
+                task = pri[pri[1]]
+                tries += 1
+                pri[1] += 1
+                if pri[1] >= length:
+                    pri[1] = 2
+                if task.go_flag:
+                    task._run()
+                    return True
+
+        # Nothing is ready, so wait for the next timer or a call to go()
+        self._idle(now)
+        return False
+
+
+    def _idle(self, start):
+        """!
+        Wait until the first timer is due or some task's go flag is set.
+        @param start The time at which the scheduler found nothing to run
+        """
+        wait = None
+        if self._timers:
+            wait = utime.ticks_diff(self._timers[0]._next_run, start)
+        while not self._any_go():
+            if wait != None:
+                left = wait - utime.ticks_diff(utime.ticks_us(), start)
+                if left < 0:
+                    break
+                if left <= self.spin_us:
+                    continue
+            _wait()
+        self.idle_us += utime.ticks_diff(utime.ticks_us(), start)
+
+
+    def _any_go(self):
+        """!
+        Check whether any task has its go flag set.
+        """
+        for task in self._tasks:
+            if task.go_flag:
+                return True
+        return False
+
+
+    def percentiles(self, percents=(50, 95, 99)):
+        """!
+        Export the run duration and lateness percentiles of every profiled
+        task, for printing or for saving to a file.
+        @param percents The percentiles wanted, each from 0 to 100
+        @return A list with a tuple for each task of its name, a tuple of
+                duration percentiles, a tuple of lateness percentiles (empty
+                if the task isn't timed) and its number of missed deadlines;
+                times are in microseconds
+        """
+        result = []
+        for task in self._tasks:
+            if not task._prof:
+                continue
+            run = tuple(task.percentile(pct) for pct in percents)
+            late = ()
+            if task.period != None:
+                late = tuple(task.percentile(pct, late=True) for pct in percents)
+            result.append((task.name, run, late, task.misses))
+        return result
+
+
+    def percentile_report(self, percents=(50, 95, 99)):
+        """!
+        Create a table of the run duration and lateness percentiles of every
+        profiled task, in milliseconds.
+        @param percents The percentiles wanted, each from 0 to 100
+        @return A string with a line for each task
+        """
+        header = 'TASK            '
+        for kind in ('DUR', 'LATE'):
+            for pct in percents:
+                header += f"{kind + ' P' + str(pct):>10s}"
+        ret_str = header + '    MISSES\n'
+        for name, run, late, misses in self.percentiles(percents):
+            line = f"{name:<16s}"
+            for value in run + (late or (None,) * len(percents)):
+                if value == None:
+                    line += '         -'
+                else:
+                    line += f"{value / 1000.0: 10.3f}"
+            ret_str += line + f"{misses: 10d}\n"
+        return ret_str
+
+
     def __repr__(self):
         """!
         Create some diagnostic text showing the tasks in the task list.
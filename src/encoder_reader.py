@@ -7,6 +7,9 @@ This file contains code which computes the reading from the encoder in order to
 """
 
 import pyb # Micropython library
+import event_log # Record events to be printed when the tasks are idle
+
+_EV_WRAP = event_log.logger.event("encoder wrap cur {} former {}", event_log.DEBUG)
 
 class EncoderReader:
     """!
@@ -31,9 +34,7 @@ class EncoderReader:
         current_position = self.timer.counter()
         if current_position - self.former_position > 30000:
             difference = current_position - 65535 + self.former_position
-            print(current_position)
-            print(self.former_position)
-            print("cur, for")
+            event_log.logger.log(_EV_WRAP, current_position, self.former_position)
         elif current_position - self.former_position < -30000:
             difference = current_position + 65535 - self.former_position
         else:
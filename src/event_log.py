@@ -0,0 +1,182 @@
+"""!
+@file event_log.py
+This file contains a deferred logger which lets tasks and interrupt service
+routines record events without printing them.
+
+Printing from a task blocks for as long as the USB or UART REPL takes to
+send the text, and formatting the text allocates memory. Instead, each call
+to @c EventLog.log() stores a fixed-size record of a timestamp, an event
+number and up to three integers in a preallocated ring buffer. The records
+are formatted and printed later by a low priority flusher task, when the
+control tasks have nothing to do.
+
+Events are registered once, usually when a module is imported, with a
+format string and a level:
+@code
+    _EV_FIRE = event_log.logger.event("fire at yaw {} pitch {}")
+    ...
+    event_log.logger.log(_EV_FIRE, yaw, pitch)
+@endcode
+
+@author mecha12
+@date   17-Oct-2026
+"""
+
+import pyb
+import utime
+from array import array
+
+## Level of events which help debugging but are usually too many to read
+DEBUG = const(10)
+## Level of events which describe normal operation
+INFO = const(20)
+## Level of events which show something unexpected
+WARNING = const(30)
+## Level of events which show something has failed
+ERROR = const(40)
+
+# The number of integers in each record: time, event and three arguments
+_RECORD = const(5)
+
+
+class EventLog:
+    """!
+    A ring buffer of event records, formatted only when flushed.
+
+    Logging an event stores five integers and allocates nothing, so it can
+    be called from tasks and interrupt service routines alike. When the
+    buffer is full, new records are dropped and counted rather than waiting
+    for the flusher, so logging never blocks.
+    """
+
+    def __init__(self, capacity=128, level=INFO):
+        """!
+        Allocate the ring buffer.
+        @param capacity The number of records the buffer can hold
+        @param level Events below this level are ignored when logged
+        """
+        self._records = array('l', [0] * (capacity * _RECORD))
+        self._capacity = capacity
+        self._head = 0
+        self._count = 0
+
+        # Format string and level of each registered event
+        self._formats = []
+        self._levels = bytearray()
+
+        ## Events below this level are discarded without being stored
+        self.level = level
+        ## The number of records dropped because the buffer was full
+        self.dropped = 0
+
+        # How long the last record took to format and print, in microseconds
+        self._record_us = 0
+
+    def event(self, fmt, level=INFO):
+        """!
+        Register an event. This allocates, so it should be done at startup.
+        @param fmt A format string with a @c {} for each integer logged
+               with the event
+        @param level The level of the event, such as @c INFO
+        @return The event number to pass to @c log()
+        """
+        self._formats.append(fmt)
+        self._levels.append(level)
+        return len(self._formats) - 1
+
+    def log(self, event, a=0, b=0, c=0):
+        """!
+        Record an event to be printed later.
+        @param event An event number from @c event()
+        @param a The first integer to be formatted with the event
+        @param b The second integer
+        @param c The third integer
+        """
+        if self._levels[event] < self.level:
+            return
+        now = utime.ticks_us()
+
+        # Claim a slot with interrupts off, since an ISR may also log
+        irq_state = pyb.disable_irq()
+        if self._count >= self._capacity:
+            self.dropped += 1
+            pyb.enable_irq(irq_state)
+            return
+        slot = self._head + self._count
+        if slot >= self._capacity:
+            slot -= self._capacity
+        self._count += 1
+        slot *= _RECORD
+        records = self._records
+        records[slot] = now
+        records[slot + 1] = event
+        records[slot + 2] = a
+        records[slot + 3] = b
+        records[slot + 4] = c
+        pyb.enable_irq(irq_state)
+
+    def __len__(self):
+        return self._count
+
+    def flush(self, budget=None):
+        """!
+        Format and print stored records, oldest first.
+        @details Before each record the time already spent, plus the time
+                 the previous record took to print, is checked against the
+                 budget, so that a flush stops before the record which would
+                 overrun it rather than after. The first record is always
+                 printed so that the log keeps moving; if one record takes
+                 longer than the budget, one is printed per call.
+        @param budget The most time in microseconds to spend, or @c None to
+               print every record
+        @return The number of records printed
+        """
+        start = utime.ticks_us()
+        printed = 0
+        while self._count:
+            if budget is not None and printed and utime.ticks_diff(
+                    utime.ticks_us(), start) + self._record_us > budget:
+                return printed
+            record_start = utime.ticks_us()
+            slot = self._head * _RECORD
+            records = self._records
+            text = self._formats[records[slot + 1]].format(
+                records[slot + 2], records[slot + 3], records[slot + 4])
+            print(f"{records[slot] / 1000:12.3f} {text}")
+
+            irq_state = pyb.disable_irq()
+            self._head += 1
+            if self._head >= self._capacity:
+                self._head = 0
+            self._count -= 1
+            pyb.enable_irq(irq_state)
+
+            printed += 1
+            self._record_us = utime.ticks_diff(utime.ticks_us(), record_start)
+
+        # The dropped count is printed like a record, when there's time
+        if self.dropped and (budget is None or not printed or utime.ticks_diff(
+                utime.ticks_us(), start) + self._record_us <= budget):
+            print(f"{self.dropped} log records dropped")
+            self.dropped = 0
+        return printed
+
+    def flusher(self, budget=2000):
+        """!
+        Generator for a cotask task which prints the log in idle time.
+        @details Give the task a priority below all the control tasks, so
+                 that it only runs when none of them is ready:
+        @code
+            task = cotask.Task(logger.flusher, name="Log Flusher",
+                               priority=0, period=100)
+        @endcode
+        @param budget The most time in microseconds to spend printing
+               each time the task runs
+        """
+        while True:
+            self.flush(budget)
+            yield 0
+
+
+## The system-wide event log, used by the tasks and drivers in this project
+logger = EventLog()
@@ -0,0 +1,133 @@
+"""!
+@file fit_aim_tables.py
+This file contains a tool which fits the aiming lookup tables of
+@c aim_tables.py to recorded pairs of hot spot position and encoder
+reading, and writes them to a calibration file.
+
+Each pair is recorded by aiming the turret at a warm target by hand and
+noting the hot spot position logged by the picture task along with the
+encoder reading relative to the datum. The position is copied just as it
+is logged, in 1/256 pixel (x for yaw, y for pitch), so the log line
+@c "hot spot x 3149 y 1792 (1/256 px)" gives pairs such as these, kept
+in a text file with one pair per line:
+
+    yaw 3149 -1830
+    pitch 1792 310
+
+Run the tool on a PC or the board with
+
+    python fit_aim_tables.py pairs.txt aim.cal
+
+and copy @c aim.cal to the board, where @c main.py loads it at startup.
+
+@author mecha12
+@date   17-Oct-2026
+"""
+
+from aim_tables import AimTables
+from hotspot import SUBPIXEL_BITS
+
+
+def fit_table(pairs, size, smoothing=1.0):
+    """!
+    Fit a lookup table to (position, ticks) pairs by least squares.
+    @details The table is interpolated linearly between its entries as in
+             @c AimTables, so each pair constrains the two entries around
+             its position. A penalty on the second difference of the table
+             keeps entries without nearby pairs on a smooth curve through
+             their neighbours.
+    @param   pairs A sequence of (position, ticks) pairs, positions in pixels
+    @param   size The number of entries in the table
+    @param   smoothing The weight of the smoothness penalty
+    @returns A list of @c size integer tick offsets
+    """
+    if len(set(position for position, ticks in pairs)) < 2:
+        raise ValueError("need pairs at two or more positions")
+
+    # Normal equations (A'A + s D'D) t = A'b of the penalised problem
+    matrix = [[0.0] * size for _ in range(size)]
+    rhs = [0.0] * size
+    for position, ticks in pairs:
+        idx = min(max(int(position), 0), size - 2)
+        frac = position - idx
+        weights = ((idx, 1.0 - frac), (idx + 1, frac))
+        for row, w_row in weights:
+            rhs[row] += w_row * ticks
+            for col, w_col in weights:
+                matrix[row][col] += w_row * w_col
+    for idx in range(1, size - 1):
+        diff = ((idx - 1, 1.0), (idx, -2.0), (idx + 1, 1.0))
+        for row, w_row in diff:
+            for col, w_col in diff:
+                matrix[row][col] += smoothing * w_row * w_col
+
+    # Gaussian elimination with partial pivoting
+    for col in range(size):
+        pivot = max(range(col, size), key=lambda row: abs(matrix[row][col]))
+        matrix[col], matrix[pivot] = matrix[pivot], matrix[col]
+        rhs[col], rhs[pivot] = rhs[pivot], rhs[col]
+        for row in range(col + 1, size):
+            scale = matrix[row][col] / matrix[col][col]
+            if scale:
+                for k in range(col, size):
+                    matrix[row][k] -= scale * matrix[col][k]
+                rhs[row] -= scale * rhs[col]
+    table = [0.0] * size
+    for row in range(size - 1, -1, -1):
+        total = rhs[row]
+        for k in range(row + 1, size):
+            total -= matrix[row][k] * table[k]
+        table[row] = total / matrix[row][row]
+    return [round(value) for value in table]
+
+
+def read_pairs(filename):
+    """!
+    Read recorded pairs from a file.
+    @param   filename The name of the file of pairs, with positions in the
+             fixed-point units of the hot spot log
+    @returns A dictionary of lists of (position, ticks) pairs by axis name,
+             with positions converted to pixels
+    """
+    pairs = {'yaw': [], 'pitch': []}
+    with open(filename, 'r') as file:
+        for line in file:
+            fields = line.replace(',', ' ').split()
+            if not fields or fields[0].startswith('#'):
+                continue
+            if fields[0] not in pairs:
+                raise ValueError(f"unknown axis: {fields[0]}")
+            position = float(fields[1]) / (1 << SUBPIXEL_BITS)
+            pairs[fields[0]].append((position, float(fields[2])))
+    return pairs
+
+
+def main(pairs_file, cal_file, smoothing=1.0):
+    """!
+    Fit the tables to a file of pairs and write a calibration file. An
+    axis without pairs keeps the table of the default geometry.
+    @param   pairs_file The name of the file of pairs
+    @param   cal_file The name of the calibration file to write
+    @param   smoothing The weight of the smoothness penalty
+    """
+    aim = AimTables()
+    for name, pairs in read_pairs(pairs_file).items():
+        if not pairs:
+            print(f"{name}: no pairs, keeping the default geometry")
+            continue
+        table = getattr(aim, name)
+        for idx, value in enumerate(fit_table(pairs, len(table), smoothing)):
+            table[idx] = value
+        lookup = aim.yaw_ticks if name == 'yaw' else aim.pitch_ticks
+        residual = max(abs(lookup(round(position * (1 << SUBPIXEL_BITS))) - ticks)
+                       for position, ticks in pairs)
+        print(f"{name}: {len(pairs)} pairs, worst residual {residual} ticks")
+    aim.save(cal_file)
+
+
+if __name__ == "__main__":
+    import sys
+    if len(sys.argv) not in (3, 4):
+        print("usage: fit_aim_tables.py PAIRS_FILE CAL_FILE [SMOOTHING]")
+        sys.exit(1)
+    main(sys.argv[1], sys.argv[2], *(float(arg) for arg in sys.argv[3:]))
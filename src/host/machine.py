@@ -0,0 +1,72 @@
+"""!
+@file machine.py
+This file is a CPython stand-in for the parts of MicroPython's @c machine
+module which the turret code uses.
+
+There is no real I2C bus on a PC, so an @c I2C object forwards every
+transaction to a device registered for its bus number in @c I2C.devices,
+such as an @c mlx90640.emulator.EmulatedCamera:
+@code
+    machine.I2C.devices[1] = EmulatedCamera(HotSpotScene())
+    camera = MLX_Cam(machine.I2C(1))
+@endcode
+
+@author mecha12
+@date   17-Oct-2026
+"""
+
+import pyb
+import utime
+
+Pin = pyb.Pin
+
+_ENODEV = 19
+
+
+class I2C:
+    """!
+    An I2C bus which forwards transactions to a registered device.
+    """
+
+    ## Devices standing in for each bus, by bus number
+    devices = {}
+
+    def __init__(self, id=0, *, freq=400000, **kwargs):
+        self.id = id
+        self.freq = freq
+
+    def _device(self):
+        device = self.devices.get(self.id)
+        if device is None:
+            raise OSError(_ENODEV)
+        return device
+
+    def scan(self):
+        device = self.devices.get(self.id)
+        return [] if device is None else device.scan()
+
+    def readfrom_mem(self, addr, memaddr, nbytes, *, addrsize=8):
+        return self._device().readfrom_mem(addr, memaddr, nbytes,
+                                           addrsize=addrsize)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, *, addrsize=8):
+        self._device().readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
+
+    def writeto_mem(self, addr, memaddr, buf, *, addrsize=8):
+        self._device().writeto_mem(addr, memaddr, buf, addrsize=addrsize)
+
+
+def freq():
+    return 80000000
+
+
+def idle():
+    pass
+
+
+def reset():
+    raise SystemExit
+
+
+def unique_id():
+    return b'host'
@@ -0,0 +1,40 @@
+"""!
+@file micropython.py
+This file is a CPython stand-in for MicroPython's @c micropython module.
+The code emitter decorators leave functions as they are.
+
+@author mecha12
+@date   17-Oct-2026
+"""
+
+import builtins
+
+
+def const(value):
+    return value
+
+builtins.const = const
+
+
+def native(func):
+    return func
+
+
+def viper(func):
+    return func
+
+
+def alloc_emergency_exception_buf(size):
+    pass
+
+
+def schedule(func, arg):
+    func(arg)
+
+
+def opt_level(level=None):
+    return 0
+
+
+def mem_info(verbose=None):
+    print("mem: not available on host")
@@ -0,0 +1,267 @@
+"""!
+@file pyb.py
+This file is a CPython stand-in for the parts of MicroPython's @c pyb
+module which the turret code uses.
+
+Pins remember their levels, timers count and remember channel settings, and
+external interrupts can be fired from a test with @c ExtInt.trigger(), so
+tasks can be run and inspected without hardware.
+
+@author mecha12
+@date   17-Oct-2026
+"""
+
+import utime
+
+_irq_enabled = True
+
+
+def disable_irq():
+    """!
+    Disable interrupts, returning the previous state for @c enable_irq().
+    """
+    global _irq_enabled
+    state = _irq_enabled
+    _irq_enabled = False
+    return state
+
+
+def enable_irq(state=True):
+    global _irq_enabled
+    _irq_enabled = state
+
+
+def delay(ms):
+    utime.sleep_ms(ms)
+
+
+def udelay(us):
+    utime.sleep_us(us)
+
+
+def millis():
+    return utime.ticks_ms()
+
+
+def micros():
+    return utime.ticks_us()
+
+
+def elapsed_millis(start):
+    return utime.ticks_diff(utime.ticks_ms(), start)
+
+
+def elapsed_micros(start):
+    return utime.ticks_diff(utime.ticks_us(), start)
+
+
+def wfi():
+    pass
+
+
+class _Board:
+    # Pin.board.NAME gives the pin name, so any board pin can be named
+    def __getattr__(self, name):
+        return name
+
+
+class Pin:
+    """!
+    A GPIO pin which remembers its level.
+    """
+    board = _Board()
+    cpu = _Board()
+
+    IN = 0
+    OUT_PP = 1
+    OUT_OD = 2
+    AF_PP = 3
+    AF_OD = 4
+    ANALOG = 5
+    OUT = OUT_PP
+    PULL_NONE = 0
+    PULL_UP = 1
+    PULL_DOWN = 2
+
+    def __init__(self, pin, mode=IN, pull=PULL_NONE, value=None, **kwargs):
+        self._name = getattr(pin, '_name', pin)
+        self.mode = mode
+        self.pull = pull
+        self._value = 1 if pull == self.PULL_UP else 0
+        if value is not None:
+            self._value = 1 if value else 0
+
+    def init(self, mode=IN, pull=PULL_NONE, value=None, **kwargs):
+        self.__init__(self._name, mode, pull, value)
+
+    def value(self, value=None):
+        if value is None:
+            return self._value
+        self._value = 1 if value else 0
+
+    def high(self):
+        self._value = 1
+
+    def low(self):
+        self._value = 0
+
+    on = high
+    off = low
+
+    def name(self):
+        return self._name
+
+    def __repr__(self):
+        return f"Pin({self._name})"
+
+
+class TimerChannel:
+    """!
+    A timer channel which remembers its output settings.
+    """
+
+    def __init__(self, timer, channel, mode, pin=None, **kwargs):
+        self.timer = timer
+        self.channel_number = channel
+        self.mode = mode
+        self.pin = pin
+        self._pulse_width = kwargs.get('pulse_width', 0)
+        self._compare = 0
+        if 'pulse_width_percent' in kwargs:
+            self.pulse_width_percent(kwargs['pulse_width_percent'])
+
+    def pulse_width(self, value=None):
+        if value is None:
+            return self._pulse_width
+        self._pulse_width = value
+
+    def pulse_width_percent(self, value=None):
+        period = self.timer.period() + 1
+        if value is None:
+            return self._pulse_width * 100 / period
+        self._pulse_width = int(value * period / 100)
+
+    def compare(self, value=None):
+        if value is None:
+            return self._compare
+        self._compare = value
+
+    capture = compare
+
+
+class Timer:
+    """!
+    A hardware timer. Its counter only changes when set, so a test can
+    move an encoder by writing the counter.
+    """
+    UP = 0
+    DOWN = 1
+    CENTER = 2
+    PWM = 0
+    PWM_INVERTED = 1
+    OC_TIMING = 2
+    OC_ACTIVE = 3
+    OC_INACTIVE = 4
+    OC_TOGGLE = 5
+    OC_FORCED_ACTIVE = 6
+    OC_FORCED_INACTIVE = 7
+    IC = 8
+    ENC_A = 9
+    ENC_B = 10
+    ENC_AB = 11
+    HIGH = 0
+    LOW = 1
+    RISING = 0
+    FALLING = 1
+    BOTH = 2
+
+    def __init__(self, id, *, freq=None, prescaler=0, period=0xFFFF,
+                 callback=None, **kwargs):
+        self.id = id
+        self._channels = {}
+        self._counter = 0
+        self.init(freq=freq, prescaler=prescaler, period=period,
+                  callback=callback)
+
+    def init(self, *, freq=None, prescaler=0, period=0xFFFF, callback=None,
+             **kwargs):
+        self._freq = freq
+        self._prescaler = prescaler
+        self._period = period
+        self._callback = callback
+
+    def deinit(self):
+        self._callback = None
+        self._channels.clear()
+
+    def channel(self, channel, mode=None, pin=None, **kwargs):
+        if mode is None:
+            return self._channels.get(channel)
+        ch = TimerChannel(self, channel, mode, pin, **kwargs)
+        self._channels[channel] = ch
+        return ch
+
+    def counter(self, value=None):
+        if value is None:
+            return self._counter
+        self._counter = value & self._period
+
+    def freq(self, value=None):
+        if value is None:
+            return self._freq
+        self._freq = value
+
+    def period(self, value=None):
+        if value is None:
+            return self._period
+        self._period = value
+
+    def prescaler(self, value=None):
+        if value is None:
+            return self._prescaler
+        self._prescaler = value
+
+    def callback(self, func):
+        self._callback = func
+
+    def trigger(self):
+        """!
+        Run the timer's callback as its interrupt would.
+        """
+        if self._callback is not None:
+            self._callback(self)
+
+
+class ExtInt:
+    """!
+    An external interrupt on a pin, fired from a test by @c trigger().
+    """
+    IRQ_RISING = 0
+    IRQ_FALLING = 1
+    IRQ_RISING_FALLING = 2
+    EVT_RISING = 3
+    EVT_FALLING = 4
+    EVT_RISING_FALLING = 5
+
+    def __init__(self, pin, mode, pull, callback):
+        self.pin = pin
+        self.mode = mode
+        self.pull = pull
+        self.callback = callback
+        self._enabled = True
+
+    def enable(self):
+        self._enabled = True
+
+    def disable(self):
+        self._enabled = False
+
+    def line(self):
+        return 0
+
+    def swint(self):
+        self.trigger()
+
+    def trigger(self):
+        if self._enabled and self.callback is not None:
+            self.callback(self.pin)
@@ -0,0 +1,30 @@
+"""!
+@file sitecustomize.py
+This file sets up CPython to run the turret code on a PC.
+
+The directory holding this file contains stand-ins for the MicroPython
+modules the project imports (@c pyb, @c machine, @c utime, @c micropython,
+@c uctypes and @c ucollections). Putting it on the module search path
+ahead of @c src lets the unmodified drivers, @c cotask and @c task_share
+run under CPython, where they can be profiled with the usual tools:
+@code
+    PYTHONPATH=src/host:src python -m cProfile -s cumtime my_script.py
+@endcode
+
+CPython imports this file by itself at startup when it is on the path. It
+adds the MicroPython built-ins which have no module of their own.
+
+@author mecha12
+@date   17-Oct-2026
+"""
+
+import builtins
+import gc
+
+# MicroPython's compiler folds const() into the code; here it's a no-op
+builtins.const = lambda value: value
+
+# Heap statistics; CPython has no fixed heap, so report a plentiful one
+if not hasattr(gc, 'mem_free'):
+    gc.mem_free = lambda: 1 << 20
+    gc.mem_alloc = lambda: 0
@@ -0,0 +1,9 @@
+"""!
+@file ucollections.py
+This file is a CPython stand-in for MicroPython's @c ucollections module.
+
+@author mecha12
+@date   17-Oct-2026
+"""
+
+from collections import namedtuple, deque, OrderedDict
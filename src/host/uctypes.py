@@ -0,0 +1,135 @@
+"""!
+@file uctypes.py
+This file is a CPython stand-in for MicroPython's @c uctypes module.
+
+As on the board, @c addressof() gives the real address of a buffer and
+@c struct and @c bytearray_at() read and write memory at an address, here
+through @c ctypes. Structures of scalars and bitfields are supported, which
+covers the layouts built by @c mlx90640.utils.field_desc(); nested
+structures, pointers and arrays are not.
+
+@author mecha12
+@date   17-Oct-2026
+"""
+
+import ctypes
+import struct as _struct
+
+# Layout word encoding, as in MicroPython's moductypes.c
+_OFFSET_MASK = (1 << 17) - 1
+BF_POS = 17
+BF_LEN = 22
+_VAL_TYPE_SHIFT = 27
+
+UINT8 = 0 << _VAL_TYPE_SHIFT
+INT8 = 1 << _VAL_TYPE_SHIFT
+UINT16 = 2 << _VAL_TYPE_SHIFT
+INT16 = 3 << _VAL_TYPE_SHIFT
+UINT32 = 4 << _VAL_TYPE_SHIFT
+INT32 = 5 << _VAL_TYPE_SHIFT
+UINT64 = 6 << _VAL_TYPE_SHIFT
+INT64 = 7 << _VAL_TYPE_SHIFT
+BFUINT8 = 8 << _VAL_TYPE_SHIFT
+BFINT8 = 9 << _VAL_TYPE_SHIFT
+BFUINT16 = 10 << _VAL_TYPE_SHIFT
+BFINT16 = 11 << _VAL_TYPE_SHIFT
+BFUINT32 = 12 << _VAL_TYPE_SHIFT
+BFINT32 = 13 << _VAL_TYPE_SHIFT
+FLOAT32 = 14 << _VAL_TYPE_SHIFT
+FLOAT64 = 15 << _VAL_TYPE_SHIFT
+VOID = UINT8
+
+PTR = 1 << 30
+ARRAY = 2 << 30
+
+LITTLE_ENDIAN = 0
+BIG_ENDIAN = 1
+NATIVE = 2
+
+_ORDER = {LITTLE_ENDIAN: '<', BIG_ENDIAN: '>', NATIVE: '='}
+
+# struct format of each value type, indexed by type number
+_FORMATS = ('B', 'b', 'H', 'h', 'I', 'i', 'Q', 'q',
+            'B', 'B', 'H', 'H', 'I', 'I', 'f', 'd')
+
+
+def addressof(obj):
+    """!
+    The address of the memory of a buffer object.
+    """
+    if isinstance(obj, bytes):
+        return ctypes.cast(ctypes.c_char_p(obj), ctypes.c_void_p).value
+    view = memoryview(obj)
+    if view.readonly:
+        raise TypeError("addressof needs a writable buffer or bytes")
+    return ctypes.addressof(ctypes.c_char.from_buffer(view))
+
+
+def bytearray_at(addr, size):
+    """!
+    A byte buffer aliasing @c size bytes of memory at @c addr.
+    """
+    return memoryview((ctypes.c_ubyte * size).from_address(addr)).cast('B')
+
+
+def sizeof(struct, layout_type=NATIVE):
+    """!
+    The size in bytes of a structure or a layout dictionary.
+    """
+    if isinstance(struct, globals()['struct']):
+        struct = object.__getattribute__(struct, '_descriptor')
+    size = 0
+    for desc in struct.values():
+        if not isinstance(desc, int):
+            raise NotImplementedError("only scalar fields are supported")
+        vtype = desc >> _VAL_TYPE_SHIFT & 0xF
+        end = (desc & _OFFSET_MASK) + _struct.calcsize(_FORMATS[vtype])
+        size = max(size, end)
+    return size
+
+
+class struct:
+    """!
+    A structure of scalar and bitfield fields at a memory address.
+    """
+
+    def __init__(self, addr, descriptor, layout_type=NATIVE):
+        object.__setattr__(self, '_addr', addr)
+        object.__setattr__(self, '_descriptor', descriptor)
+        object.__setattr__(self, '_order', _ORDER[layout_type])
+
+    def _field(self, name):
+        desc = object.__getattribute__(self, '_descriptor')[name]
+        if not isinstance(desc, int):
+            raise NotImplementedError("only scalar fields are supported")
+        vtype = desc >> _VAL_TYPE_SHIFT & 0xF
+        fmt = object.__getattribute__(self, '_order') + _FORMATS[vtype]
+        addr = object.__getattribute__(self, '_addr') + (desc & _OFFSET_MASK)
+        return desc, vtype, fmt, addr
+
+    def __getattr__(self, name):
+        desc, vtype, fmt, addr = self._field(name)
+        value, = _struct.unpack(fmt, ctypes.string_at(addr, _struct.calcsize(fmt)))
+        if 8 <= vtype <= 13:
+            pos = desc >> BF_POS & 31
+            bits = desc >> BF_LEN & 31
+            value = value >> pos & ((1 << bits) - 1)
+            if vtype & 1 and value >= 1 << (bits - 1):
+                value -= 1 << bits
+        return value
+
+    def __setattr__(self, name, value):
+        desc, vtype, fmt, addr = self._field(name)
+        size = _struct.calcsize(fmt)
+        if 8 <= vtype <= 13:
+            pos = desc >> BF_POS & 31
+            bits = desc >> BF_LEN & 31
+            mask = ((1 << bits) - 1) << pos
+            word, = _struct.unpack(fmt, ctypes.string_at(addr, size))
+            value = (word & ~mask) | ((value << pos) & mask)
+        elif vtype < 8:
+            # wrap to the field width like a C store
+            value &= (1 << (8 * size)) - 1
+            if vtype & 1 and value >= 1 << (8 * size - 1):
+                value -= 1 << (8 * size)
+        ctypes.memmove(addr, _struct.pack(fmt, value), size)
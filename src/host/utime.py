@@ -0,0 +1,67 @@
+"""!
+@file utime.py
+This file is a CPython stand-in for MicroPython's @c utime module.
+
+Tick counters wrap around at @c TICKS_PERIOD like they do on the board, so
+code which forgets to use @c ticks_diff() fails here too.
+
+@author mecha12
+@date   17-Oct-2026
+"""
+
+import time as _time
+
+## Tick counters count modulo this value, as in MicroPython ports
+TICKS_PERIOD = 1 << 30
+_TICKS_MAX = TICKS_PERIOD - 1
+_TICKS_HALF = TICKS_PERIOD // 2
+
+# Ticks start near zero when the module is imported, as after a reset
+_origin = _time.perf_counter_ns()
+
+
+def _ticks(scale):
+    return ((_time.perf_counter_ns() - _origin) // scale) & _TICKS_MAX
+
+
+def ticks_us():
+    return _ticks(1000)
+
+
+def ticks_ms():
+    return _ticks(1000000)
+
+
+def ticks_cpu():
+    return _ticks(1)
+
+
+def ticks_add(ticks, delta):
+    return (ticks + delta) & _TICKS_MAX
+
+
+def ticks_diff(ticks1, ticks2):
+    """!
+    Signed difference between two tick values, correct across wraparound
+    as long as they are less than half a period apart.
+    """
+    return ((ticks1 - ticks2 + _TICKS_HALF) & _TICKS_MAX) - _TICKS_HALF
+
+
+def sleep(seconds):
+    _time.sleep(seconds)
+
+
+def sleep_ms(ms):
+    _time.sleep(ms / 1000)
+
+
+def sleep_us(us):
+    _time.sleep(us / 1000000)
+
+
+def time():
+    return int(_time.time())
+
+
+localtime = _time.localtime
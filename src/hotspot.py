@@ -0,0 +1,324 @@
+"""!
+@file hotspot.py
+This file contains hot spot detectors which work on raw images from the
+MLX90640 camera wrapper in @c mlx_cam.py.
+
+@author mecha12
+@date   17-Oct-2026
+"""
+
+from array import array
+from mlx90640.calibration import NUM_ROWS, NUM_COLS
+from mlx90640.utils import array_filled
+
+## The number of pixels in a horizontal cluster
+CLUSTER_WIDTH = const(4)
+
+## The number of clusters in each row of the image
+CLUSTERS_PER_ROW = const(NUM_COLS // CLUSTER_WIDTH)
+
+## The number of clusters in the image
+NUM_CLUSTERS = const(NUM_ROWS * NUM_COLS // CLUSTER_WIDTH)
+
+## The number of fractional bits in fixed-point sub-pixel coordinates
+SUBPIXEL_BITS = const(8)
+
+
+class SubpageHotSpot:
+    """!
+    Finds the hottest 1x4 pixel cluster, updated one subpage at a time.
+
+    The clusters are the same as those of @c MLX_Cam.find_hotSpot(), with
+    the image mirrored left to right. Each subpage keeps its own partial
+    cluster sums, so a new subpage only touches its own 384 pixels and a
+    new estimate is available after every subpage rather than every frame.
+    """
+
+    def __init__(self):
+        """!
+        Allocate the partial cluster sums for both subpages.
+        """
+        ## Partial sums of each cluster, one array for each subpage
+        self._sums = (array_filled('l', NUM_CLUSTERS),
+                      array_filled('l', NUM_CLUSTERS))
+
+        # Bit mask of the subpages whose sums have been filled in
+        self._seen = 0
+
+        ## Top row of the hottest cluster found by the last update
+        self.row = 0
+        ## Left column (unmirrored) of the hottest cluster found by the last update
+        self.col = 0
+        ## The size of the clusters, for use by @c Centroid.refine()
+        self.rows = 1
+        self.cols = CLUSTER_WIDTH
+
+    def update(self, image, subpage):
+        """!
+        Fold a freshly read subpage into the cluster sums and find the
+        hottest cluster.
+        @param   image The raw image holding the subpage, or any sequence of
+                 768 pixel values such as a foreground image
+        @param   subpage The @c Subpage which was just read into @c image
+        @returns The coordinates [x, y] of the centre of the hottest
+                 cluster, in the same units as @c MLX_Cam.find_hotSpot(),
+                 or @c None until both subpages have been seen
+        """
+        sums = self._sums[subpage.id]
+        for cluster in range(NUM_CLUSTERS):
+            sums[cluster] = 0
+
+        # Cluster of pixel idx: row * 8 + (31 - col) // 4, which for a 32
+        # pixel wide image is (idx // 4) with the low three bits inverted
+        pix = getattr(image, 'pix', image)
+        for idx in subpage.sp_range():
+            sums[(idx >> 2) ^ 7] += pix[idx]
+
+        self._seen |= 1 << subpage.id
+        if self._seen != 0b11:
+            return None
+
+        other = self._sums[subpage.id ^ 1]
+        best = 0
+        best_sum = sums[0] + other[0]
+        for cluster in range(1, NUM_CLUSTERS):
+            total = sums[cluster] + other[cluster]
+            if total > best_sum:
+                best = cluster
+                best_sum = total
+
+        self.row = best // CLUSTERS_PER_ROW
+        self.col = NUM_COLS - CLUSTER_WIDTH * (best % CLUSTERS_PER_ROW + 1)
+        return cluster_position(best)
+
+
+    def clear(self, subpage):
+        """!
+        Zero the cluster sums of a subpage which was read but not passed to
+        @c update(), such as one with no foreground, so that the next
+        estimate doesn't use sums left over from an older subpage.
+        @param   subpage The @c Subpage which was skipped
+        """
+        sums = self._sums[subpage.id]
+        for cluster in range(NUM_CLUSTERS):
+            sums[cluster] = 0
+        self._seen |= 1 << subpage.id
+
+## Denominators from this size up are halved by @c fixed_point_ratio() until
+#  they're smaller, so that a remainder shifted up by @c SUBPIXEL_BITS stays
+#  below MicroPython's small integer limit of 2**30
+_RATIO_DEN_LIMIT = const(1 << (29 - SUBPIXEL_BITS))
+
+
+def fixed_point_ratio(num, den):
+    """!
+    Divide two non-negative integers, giving a fixed-point result.
+    @details Shifting a weighted sum up by @c SUBPIXEL_BITS before dividing
+             can exceed 2**30, which makes MicroPython allocate a long
+             integer. Instead the whole part of the quotient is found
+             first and only the remainder is shifted; a large denominator
+             is scaled down together with the remainder, which only loses
+             precision far below the fraction bits which are kept.
+    @param   num The numerator, such as a sum of weighted coordinates
+    @param   den The denominator, a positive sum of weights
+    @returns The quotient with @c SUBPIXEL_BITS fractional bits
+    """
+    whole = num // den
+    rem = num - whole * den
+    while den >= _RATIO_DEN_LIMIT:
+        den >>= 1
+        rem >>= 1
+    return (whole << SUBPIXEL_BITS) + (rem << SUBPIXEL_BITS) // den
+
+
+def cluster_position(cluster):
+    """!
+    Convert a cluster index to the coordinates of the cluster's centre.
+    @param   cluster The index of a 1x4 cluster, counted along rows
+    @returns The coordinates [x, y] of the cluster, with x in pixels
+    """
+    x = (cluster % CLUSTERS_PER_ROW) * CLUSTER_WIDTH + CLUSTER_WIDTH // 2
+    y = cluster // CLUSTERS_PER_ROW
+    return [x, y]
+
+
+class WindowHotSpot:
+    """!
+    Finds the hottest rectangular window of pixels at any offset.
+
+    An integral image (summed-area table) of the frame is built in one pass
+    into a preallocated array, after which the sum of any window takes four
+    lookups, so the search costs the same for every window size. The image
+    is mirrored left to right as in @c MLX_Cam.find_hotSpot().
+    """
+
+    def __init__(self, rows=1, cols=CLUSTER_WIDTH):
+        """!
+        Allocate the integral image for a given window size.
+        @param   rows The height of the window in pixels (default 1)
+        @param   cols The width of the window in pixels (default 4)
+        """
+        if not (0 < rows <= NUM_ROWS and 0 < cols <= NUM_COLS):
+            raise ValueError("window doesn't fit in the image")
+        ## The height of the window in pixels
+        self.rows = rows
+        ## The width of the window in pixels
+        self.cols = cols
+
+        # Integral image with a zero first row and column; entry
+        # [r * (NUM_COLS + 1) + c] is the sum of pixels above and left of it
+        self._sat = array_filled('l', (NUM_ROWS + 1) * (NUM_COLS + 1))
+
+        ## Top row of the hottest window found by the last search
+        self.row = 0
+        ## Left column (unmirrored) of the hottest window found by the last search
+        self.col = 0
+        ## Pixel sum of the hottest window found by the last search
+        self.best_sum = 0
+
+    def find(self, image):
+        """!
+        Find the hottest window in an image.
+        @param   image A raw image or any sequence of 768 pixel values
+        @returns The coordinates [x, y] of the centre of the hottest window,
+                 in the same units as @c MLX_Cam.find_hotSpot()
+        """
+        pix = getattr(image, 'pix', image)
+        sat = self._sat
+        stride = NUM_COLS + 1
+
+        # Build the integral image one row at a time from running row sums
+        for row in range(NUM_ROWS):
+            above = row * stride
+            here = above + stride
+            src = row * NUM_COLS
+            run = 0
+            for col in range(NUM_COLS):
+                run += pix[src + col]
+                sat[here + col + 1] = sat[above + col + 1] + run
+
+        # Sum of the window with corners (r, c), (r + rows, c + cols) is
+        # D - B - C + A from the four corner entries of the integral image
+        down = self.rows * stride
+        across = self.cols
+        best_sum = None
+        best_row = 0
+        best_col = 0
+        for row in range(NUM_ROWS - self.rows + 1):
+            top = row * stride
+            bottom = top + down
+            for col in range(NUM_COLS - across + 1):
+                total = (sat[bottom + col + across] - sat[bottom + col]
+                         - sat[top + col + across] + sat[top + col])
+                if best_sum is None or total > best_sum:
+                    best_sum = total
+                    best_row = row
+                    best_col = col
+
+        self.row = best_row
+        self.col = best_col
+        self.best_sum = best_sum
+        x = NUM_COLS - best_col - across + across // 2
+        y = best_row + self.rows // 2
+        return [x, y]
+
+
+class Centroid:
+    """!
+    Refines a detected hot spot to sub-pixel precision.
+
+    The hottest pixel within the detected window is taken as the peak, and
+    the weighted centroid of its neighbourhood is computed in integer
+    arithmetic, with the neighbourhood minimum as background. Results are
+    left in attributes as fixed-point integers with @c SUBPIXEL_BITS
+    fractional bits, so a refinement allocates nothing.
+    """
+
+    def __init__(self, radius=1, noise=64):
+        """!
+        Set up the refinement.
+        @param   radius The neighbourhood is a square of 2 * radius + 1
+                 pixels on a side, clipped at the image edges (default 1)
+        @param   noise The pixel contrast, in raw counts, which gives a
+                 confidence of one half (default 64)
+        """
+        self.radius = radius
+        self.noise = noise
+        ## Centroid x, mirrored like @c MLX_Cam.find_hotSpot(), fixed-point
+        self.x_fp = 0
+        ## Centroid y (row), fixed-point
+        self.y_fp = 0
+        ## Confidence of the estimate, 0 (flat) to 255 (sharp, strong peak)
+        self.confidence = 0
+
+    def refine(self, image, row, col, rows=1, cols=CLUSTER_WIDTH):
+        """!
+        Refine the hot spot in a window of the image.
+        @param   image A raw image or any sequence of 768 pixel values
+        @param   row The top row of the detected window
+        @param   col The left (unmirrored) column of the detected window
+        @param   rows The height of the detected window in pixels
+        @param   cols The width of the detected window in pixels
+        @returns @c True if a centroid was found, @c False if the
+                 neighbourhood is flat; either way the attributes are updated
+        """
+        pix = getattr(image, 'pix', image)
+
+        # Find the peak pixel within the detected window
+        peak = pix[row * NUM_COLS + col]
+        peak_row = row
+        peak_col = col
+        for r in range(row, row + rows):
+            base = r * NUM_COLS
+            for c in range(col, col + cols):
+                value = pix[base + c]
+                if value > peak:
+                    peak = value
+                    peak_row = r
+                    peak_col = c
+
+        radius = self.radius
+        top = peak_row - radius if peak_row > radius else 0
+        bottom = peak_row + radius
+        if bottom >= NUM_ROWS:
+            bottom = NUM_ROWS - 1
+        left = peak_col - radius if peak_col > radius else 0
+        right = peak_col + radius
+        if right >= NUM_COLS:
+            right = NUM_COLS - 1
+
+        # The neighbourhood minimum is taken as background
+        low = peak
+        for r in range(top, bottom + 1):
+            base = r * NUM_COLS
+            for c in range(left, right + 1):
+                if pix[base + c] < low:
+                    low = pix[base + c]
+
+        sum_w = 0
+        sum_wx = 0
+        sum_wy = 0
+        for r in range(top, bottom + 1):
+            base = r * NUM_COLS
+            for c in range(left, right + 1):
+                weight = pix[base + c] - low
+                sum_w += weight
+                sum_wx += weight * c
+                sum_wy += weight * r
+
+        if sum_w <= 0:
+            col_fp = peak_col << SUBPIXEL_BITS
+            self.y_fp = peak_row << SUBPIXEL_BITS
+            self.confidence = 0
+            found = False
+        else:
+            col_fp = fixed_point_ratio(sum_wx, sum_w)
+            self.y_fp = fixed_point_ratio(sum_wy, sum_w)
+            contrast = peak - low
+            self.confidence = (contrast * 255) // (contrast + self.noise)
+            found = True
+
+        # Mirror the column so that pixel c has its centre at 31.5 - c, the
+        # scale on which cluster centres are reported
+        self.x_fp = (NUM_COLS << SUBPIXEL_BITS) - (1 << (SUBPIXEL_BITS - 1)) - col_fp
+        return found
@@ -13,13 +13,26 @@ import pyb # Micropython library
 import utime # Micropython version of time library
 import cotask # Run cooperatively scheduled tasks in a multitasking system
 import task_share # Tasks share data
-import math
+import event_log # Record events to be printed when the tasks are idle
 
 from closed_loop_control import clCont # The closed loop control method from closed_loop_control.py
 from motor_driver import MotorDriver # The method to drive the motor from motor_drive.py
 from encoder_reader import EncoderReader # Read encoder method from encoder_reader.py
 from mlx_cam import MLX_Cam # Take values from IR camera
+from hotspot import SubpageHotSpot, Centroid # Find the hot spot one subpage at a time
+from target_predictor import AlphaBetaPredictor # Extrapolate the target between camera images
+from aim_tables import AimTables # Convert hot spot positions to encoder ticks
 from machine import Pin, I2C # Used for the ISR command 
+
+# Events logged by the tasks, printed later by the log flusher task
+logger = event_log.logger
+EV_BUTTON = logger.event("button press {}")
+EV_HOT_SPOT = logger.event("hot spot x {} y {} (1/256 px)", event_log.DEBUG)
+EV_YAW_ON_TARG = logger.event("yaw on targ", event_log.DEBUG)
+EV_YAW_MOVE = logger.event("yaw datum {} desired {} current {}", event_log.DEBUG)
+EV_PITCH_ON_TARG = logger.event("pitch on targ", event_log.DEBUG)
+EV_TRACK = logger.event("track {}", event_log.DEBUG)
+EV_FIRE = logger.event("fire")
     
 def buttonLogic(pin):
     """!
@@ -27,10 +40,9 @@ def buttonLogic(pin):
     @details The global, 'buttoncounts' is initialized and incremented by 1  
     @param   pin, the pin on which the button resides, in this case C13
     """
-    print('button press')
     global buttonCounts
     buttonCounts += 1
-    print(buttonCounts)
+    logger.log(EV_BUTTON, buttonCounts)
 
 def masterTask(shares):
     """!
@@ -99,7 +111,13 @@ def yawTask(shares):
                 encY.zero()
                 p = encY.read()
                 
-            lvl = cll.run(s_YawPos.get(), p) # Run closed loop controller
+            setpoint = s_YawPos.get()
+            if s_TimeToTrack.get() == True: # While tracking, lead the target by its predicted motion since the last image
+                setpoint += int(yawPredictor.offset(utime.ticks_us()))
+                yawDif = setpoint - p # Difference between the predicted target and the yaw position
+                if yawDif < 0: # Account for left bias in the yaw control system
+                    setpoint = int(setpoint + 1.1 * yawDif)
+            lvl = cll.run(setpoint, p) # Run closed loop controller
             moeY.set_duty_cycle(lvl) # Set the duty cycle
             yield
         yield
@@ -124,7 +142,10 @@ def pitchTask(shares):
                 encY.zero()
                 p = encY.read()
 
-            lvl = cll.run(s_PitchPos.get(), p) # Run closed loop controller
+            setpoint = s_PitchPos.get()
+            if s_TimeToTrack.get() == True: # While tracking, lead the target by its predicted motion since the last image
+                setpoint += int(pitchPredictor.offset(utime.ticks_us()))
+            lvl = cll.run(setpoint, p) # Run closed loop controller
             moeP.set_duty_cycle(lvl) # Set the duty cycle
             yield
         yield
@@ -134,54 +155,78 @@ def pictureTask(shares):
     """!
     @brief   Communicates with the closed loop controllers responsible for yaw and pitch control,
              and calculates error in position from a thermal image.
-    @details Implemented as a generator function, the pictureTask first takes an image, then uses
-             the built-in findhottest() function to get the coordinates of the hottest pixel cluster.
+    @details Implemented as a generator function, the pictureTask reads each subpage from the camera
+             as it becomes ready, then uses a SubpageHotSpot detector to update the coordinates of the
+             hottest pixel cluster.
              From this, the error in position of the turret is calculated and fed to the closed-loop
              controllers to move the turret to the desired position.
     @param   shares, the function managing the task sharing algorithm
     """
     s_YawPos, s_PitchPos, s_YawOnTarg, s_PitchOnTarg, s_TimeToTrack, s_TimeToFire, s_StopShooting = shares
     s_TimeToTrack.put(False) # State veriable for pictureTask
+    detector = SubpageHotSpot() # Hot spot estimate, updated after every subpage
+    centroid = Centroid() # Sub-pixel refinement of the hot spot
     while True:    
         while buttonCounts == 1: # If the E-Stop button is pressed only once, run the task
             if s_TimeToTrack.get() == False: # On startup, set datums at the initial encoder readings
                 yawDatum = encY.read()
                 pitchDatum = encP.read()
+                yawPredictor.reset() # Start each tracking period with no target motion
+                pitchPredictor.reset()
                 
             elif s_TimeToTrack.get() == True: # Only aim if given flag to aim
-                image = camera.get_image()
-                H, V = camera.find_hotSpot(image) # Find current hot spot from camera
-                print("Yaw Pos ", H, "Pitch Pos", V)
+                subpage = camera.poll_subpage() # Check the camera once without blocking
+                if subpage is None: # No new subpage yet, let other tasks run
+                    yield
+                    continue
+                if recorder is not None: # Save the subpage with the turret position for replay
+                    recorder.record(camera.subpage_image(), subpage, utime.ticks_us(),
+                                    encY.read(), encP.read())
+                if not camera.has_foreground: # Nothing differs from the background, skip detection
+                    detector.clear(subpage) # Don't keep this subpage's sums from an older frame
+                    yield
+                    continue
+                image = camera.detection_image() # Foreground image if a background model is used
+                hotSpot = detector.update(image, subpage) # Update hot spot with the new half frame
+                if hotSpot is None: # Both subpages haven't been seen yet
+                    yield
+                    continue
+                centroid.refine(image, detector.row, detector.col,
+                                detector.rows, detector.cols) # Refine the hot spot to a fraction of a pixel
+                logger.log(EV_HOT_SPOT, centroid.x_fp, centroid.y_fp)
                 
-                Ke = 8 # Gain value for yaw axis control
-                yawTicks = Ke * math.atan(((H - 16)/4)/18)*4000/3.14 + yawDatum # Determine the number of encoder ticks to reach the target in the yaw axis
-                print('ticks', yawTicks)
-                pitchTicks = math.atan((V*0.75*3.7/12)/18)*4000/3.14 + pitchDatum # Determine the number of encoder ticks to reach the target in the pitch axis
+                yawTicks = aim.yaw_ticks(centroid.x_fp) + yawDatum # Look up the number of encoder ticks to reach the target in the yaw axis
+                pitchAim = aim.pitch_ticks(centroid.y_fp) # Look up the number of encoder ticks to reach the target in the pitch axis
+                pitchTicks = pitchAim + pitchDatum
+
+                # Track the target's motion for the control tasks. Both predictors see only table
+                # positions and datums, never the encoders, so the turret's own motion isn't taken
+                # for the target's; the pitch target is measured down from the datum, as the pitch
+                # setpoint is from the encoder reading
+                now = utime.ticks_us()
+                yawPredictor.measure(yawTicks, now)
+                pitchPredictor.measure(pitchDatum - pitchAim, now)
 
                 yawPosRead = encY.read() # Store the current yaw position
                 pitchPosRead = encP.read() # Store the current pitch position
                 
-                yawDif = yawTicks - yawPosRead # Calculate difference between expected and actual yaw position
-                if yawDif < 0: # Account for left bias in the yaw control system
-                    yawTicks = yawTicks + 1.1 * yawDif
+                yawDif = yawTicks - yawPosRead # Calculate difference between expected and actual yaw position; the yaw task accounts for its left bias
                 pitchDif = pitchPosRead - pitchTicks # Calculate difference between expected and actual pitch position
                 
                 if abs(yawDif) <= 250: # Determine if the yaw position is under the threshold to be on target
                     s_YawOnTarg.put(True)
-                    print('yaw on targ')
+                    logger.log(EV_YAW_ON_TARG)
                     yield
                     
                 else: # If the yaw position is not on target, recalculate the yaw position
                     s_YawOnTarg.put(False)
-                    print('datum', yawDatum)
-                    print('desired', yawTicks)
-                    print('current', yawPosRead)
+                    logger.log(EV_YAW_MOVE, yawDatum, int(yawTicks), yawPosRead)
                     s_YawPos.put(int(yawTicks))
                     yield
                     
                 if abs(pitchDif) <= 200: # Determine if the pitch position is under the threshold to be on target
                     s_PitchOnTarg.put(True)
-                    print('pitch on targ')
+                    logger.log(EV_PITCH_ON_TARG)
                     yield
                     
                 else: # If the pitch position is not on target, recalculate the pitch position
@@ -210,7 +255,7 @@ def fireTask(shares):
                 yield
                 
             elif fireState == 1: # Wait until flag to track
-                print('Track', s_TimeToTrack.get())
+                logger.log(EV_TRACK, s_TimeToTrack.get())
                 if s_TimeToTrack.get() == True:
                     fireState = 2
                     ch2.pulse_width(800) # Set the servo motor back to the neutral position: 800=rest, 1500 = fire!
@@ -231,7 +276,7 @@ def fireTask(shares):
                             
                 elif s_YawOnTarg.get() == True and s_PitchOnTarg.get() == True: # Turn the servo motor on if on target
                     ch2.pulse_width(1500) # Actuate the servo motor: 800=rest, 1500 = fire!
-                    print('Fire')  
+                    logger.log(EV_FIRE)
                 yield
                 
             elif fireState == 4: # Idle state, after ten seconds of shooting
@@ -302,6 +347,25 @@ if __name__ == "__main__":
     yawStartPos = 18200 # 180 degrees, ie 3.32 rotations with a gear ratio of 15, 18200 for 180 degrees clockwise
     
     pitchStartPos = 0 # Keep steady heading, -15000 for tilt from downward to median
+    
+    # Aiming tables, from the calibration file if fit_aim_tables.py has made one
+    try:
+        aim = AimTables('aim.cal')
+    except OSError:
+        aim = AimTables()
+    
+    # Set to a file name such as 'frames.rec' to record the camera during the
+    # session. The recorder is only imported when it's used, to save memory.
+    recordFile = None
+    if recordFile is not None:
+        from mlx90640.recording import FrameRecorder # Save subpages for replay on a PC
+        recorder = FrameRecorder(recordFile)
+    else:
+        recorder = None
+    
+    # Predictors which carry the aiming setpoints forward between camera images
+    yawPredictor = AlphaBetaPredictor()
+    pitchPredictor = AlphaBetaPredictor()
     global buttonCounts
     buttonCounts = 0
 
@@ -314,27 +378,35 @@ if __name__ == "__main__":
     s_TimeToFire = task_share.Share('b', thread_protect=False, name="Time To Fire")
     s_StopShooting = task_share.Share('b', thread_protect=False, name="Stop Shooting")
     
-    # Create the tasks. If trace is enabled for any task, memory will be
-    # allocated for state transition tracing, and the application will run out
-    # of memory after a while and quit. Therefore, use tracing only for 
-    # debugging and set trace to False when it's not needed
-    task1 = cotask.Task(masterTask, name="Master Task", priority=1, period=0,
+    # Create the tasks. If trace is enabled for any task, a fixed-size buffer
+    # keeps its most recent state transitions, so tracing can stay on
+    task1 = cotask.Task(masterTask, name="Master Task", priority=1, period=10,
                         profile=True, trace=True, shares=(s_YawPos, s_PitchPos, s_YawOnTarg, s_PitchOnTarg, s_TimeToTrack, s_TimeToFire, s_StopShooting))
     task2 = cotask.Task(yawTask, name="Yaw Task", priority=2, period=40,
                         profile=True, trace=False, shares=(s_YawPos, s_PitchPos, s_YawOnTarg, s_PitchOnTarg, s_TimeToTrack, s_TimeToFire, s_StopShooting))
     task3 = cotask.Task(pitchTask, name="Pitch Task", priority=3, period=40,
                         profile=True, trace=False, shares=(s_YawPos, s_PitchPos, s_YawOnTarg, s_PitchOnTarg, s_TimeToTrack, s_TimeToFire, s_StopShooting))
-    task4 = cotask.Task(pictureTask, name="Picture Task", priority=5, period=500,
+    task4 = cotask.Task(pictureTask, name="Picture Task", priority=5, period=50,
                         profile=True, trace=False, shares=(s_YawPos, s_PitchPos, s_YawOnTarg, s_PitchOnTarg, s_TimeToTrack, s_TimeToFire, s_StopShooting))
     task5 = cotask.Task(fireTask, name="Fire Task", priority=4, period=100,
                         profile=True, trace=False, shares=(s_YawPos, s_PitchPos, s_YawOnTarg, s_PitchOnTarg, s_TimeToTrack, s_TimeToFire, s_StopShooting))
+    # The log is printed at priority 0, below every control task including the
+    # Master Task, so it only runs when none of them is ready
+    task6 = cotask.Task(logger.flusher, name="Log Flusher", priority=0, period=100,
+                        profile=True, trace=False)
                         
+    # Run the fire task as soon as either axis comes on or goes off target,
+    # rather than waiting up to a period to notice
+    s_YawOnTarg.subscribe(task5, on_change=True)
+    s_PitchOnTarg.subscribe(task5, on_change=True)
+    
     # Create the cotask list which will be run later in the program
     cotask.task_list.append(task1)
     cotask.task_list.append(task2)
     cotask.task_list.append(task3)
     cotask.task_list.append(task4)
     cotask.task_list.append(task5)
+    cotask.task_list.append(task6)
     
     # Run the memory garbage collector to ensure memory is as defragmented as
     # possible before the real-time scheduler is started
@@ -343,6 +415,8 @@ if __name__ == "__main__":
     '''Run Tasks'''
     while True:
         try:
-            cotask.task_list.pri_sched()
+            cotask.task_list.deadline_sched() # Sleeps until the next task is due
         except KeyboardInterrupt:
-            break
\ No newline at end of file
+            break
+    if recorder is not None:
+        recorder.close()
\ No newline at end of file
@@ -2,9 +2,9 @@
 @file __init__.py
 This file contains a class which controls an MLX90640 thermal infrared camera.
 
-RAW VERSION
-This version is a stripped down MLX90640 driver which produces only raw data,
-not calibrated data, in order to save memory.
+By default the driver produces only raw data, in order to save memory. Calling
+setup() with calibrated=True also builds the calibration and a ProcessedImage
+which turns each subpage into compensated IR values and temperatures.
 """
 
 from gc import collect, mem_free
@@ -14,12 +14,19 @@ from mlx90640.regmap import (
     EEPROM_MAP,
     RegisterMap,
     CameraInterface,
+    EepromImage,
+    CACHEABLE_REGISTERS,
     REG_SIZE,
     EEPROM_ADDRESS,
     EEPROM_SIZE,
 )
-# from mlx90640.calibration import CameraCalibration, TEMP_K
-from mlx90640.image import RawImage, Subpage, get_pattern_by_id
+from mlx90640.calibration import CameraCalibration, TEMP_K
+from mlx90640.image import (
+    RawImage,
+    ProcessedImage,
+    Subpage,
+    get_pattern_by_id,
+)
 
 
 class CameraDetectError(Exception):
@@ -72,29 +79,56 @@ class MLX90640:
         """!
         """
         self.iface = CameraInterface(i2c, addr)
-        self.registers = RegisterMap(self.iface, REGISTER_MAP)
+        self.registers = RegisterMap(self.iface, REGISTER_MAP,
+                                     cached=CACHEABLE_REGISTERS)
         self.eeprom = RegisterMap(self.iface, EEPROM_MAP, readonly=True)
+        self.eeprom_image = None
         self.calib = None
         self.raw = None
-#         self.image = None
+        self.image = None
         self.last_read = None
 
 
-    def setup(self, *, calib=None, raw=None, image=None):
+    def setup(self, *, calib=None, raw=None, image=None, calibrated=False,
+              calib_cache=None):
         """!
+        Allocate the image buffers. If @c calibrated is set (or a calibration
+        or processed image is given) also build the camera calibration, using
+        @c calib_cache as its flash cache file, and a @c ProcessedImage.
         """
         # We've been having some memory allocation errors which usually happen
         # as this method runs. As a workaround, run gc.collect() several times
         # to keep memory cleaned up, as when the process is finished, there is
         # a bunch of free memory (~27KB or more on STM32L476) available
-#         collect()
-#         self.calib = calib or CameraCalibration(self.iface, self.eeprom)
+        calibrated = calibrated or calib is not None or image is not None
+        if calibrated and image is None and calib is None:
+            collect()
+            self.load_eeprom()
+            calib = CameraCalibration(self.eeprom_image, self.eeprom,
+                                      cache=calib_cache)
+            # the snapshot is only needed to build the calibration
+            self.eeprom = RegisterMap(self.iface, EEPROM_MAP, readonly=True)
+            self.eeprom_image = None
+        if calibrated:
+            self.calib = calib or image.calib
         collect()
 #         print(f"setup: {mem_free()}", end='')
         self.raw = raw or RawImage()
         collect()
 #         print(f" -> {mem_free()}")
-#         self.image = image or ProcessedImage(self.calib)
+        if calibrated:
+            self.image = image or ProcessedImage(self.calib)
+            collect()
+
+
+    def load_eeprom(self, image=None):
+        """!
+        Snapshot the camera EEPROM, or use a previously saved EepromImage, and
+        serve all further @c eeprom field lookups from memory.
+        """
+        self.eeprom_image = image or EepromImage.dump(self.iface)
+        self.eeprom = RegisterMap(self.eeprom_image, EEPROM_MAP, readonly=True)
+        return self.eeprom_image
 
 
     @property
@@ -124,53 +158,52 @@ class MLX90640:
 
     def read_vdd(self):
         """!
-        Turned off to save memory for raw driver version.
+        Returns 0.0 when the driver has no calibration (raw version).
         """
         # supply voltage calculation (delta Vdd)
         # type: (self) -> float
         vdd_pix = self.registers['vdd_pix'] * self._adc_res_corr()
-#         return float(vdd_pix - self.calib.vdd_25)/self.calib.k_vdd
-        return float(vdd_pix)
+        if self.calib is None:
+            return float(vdd_pix)
+        return float(vdd_pix - self.calib.vdd_25)/self.calib.k_vdd
 
 
     def _adc_res_corr(self):
         """!
-        Turned off to save memory for raw driver version.
+        Returns 0 when the driver has no calibration (raw version).
         """
         # type: (self) -> float
-#         res_exp = self.calib.res_ee - self.registers['adc_resolution']
-#         return 1 << res_exp
-        return 0
+        if self.calib is None:
+            return 0
+        res_exp = self.calib.res_ee - self.registers['adc_resolution']
+        return 2.0**res_exp
 
 
     def read_ta(self):
         """!
-        Turned off to save memory for raw driver version.
+        Returns 0.0 when the driver has no calibration (raw version).
         """
         # ambient temperature calculation (delta Ta in degC)
         # type: (self) -> float
+        if self.calib is None:
+            return 0.0
         v_ptat = self.registers['ta_ptat']
         v_be = self.registers['ta_vbe']
-#         v_ptat_art = v_ptat/(v_ptat*self.calib.alpha_ptat + v_be) * 262144
-# 
-#         v_ta = v_ptat_art/(1.0 + self.calib.kv_ptat*self.read_vdd() - self.calib.ptat_25)
-
-        # print('v_ptat: ', v_ptat)
-        # print('v_be:', v_be)
-        # print('v_ptat_art: ', v_ptat_art)
+        v_ptat_art = v_ptat/(v_ptat*self.calib.alpha_ptat + v_be) * 262144
 
-#         return v_ta/self.calib.kt_ptat
-        return 0.0
+        v_ta = v_ptat_art/(1.0 + self.calib.kv_ptat*self.read_vdd()) - self.calib.ptat_25
+        return v_ta/self.calib.kt_ptat
 
 
     def read_gain(self):
         """!
-        Turned off to save memory for raw driver version.
+        Returns the raw gain register when the driver has no calibration.
         """
         # gain calculation
         # type: (self) -> float
-#         return self.calib.gain / self.registers['gain']
-        return float(self.registers['gain'])
+        if self.calib is None:
+            return float(self.registers['gain'])
+        return self.calib.gain / self.registers['gain']
 
 
     # tr - temperature of reflected environment
@@ -184,13 +217,13 @@ class MLX90640:
         ta = self.read_ta()
 
         ta_abs = ta + 25
-#         if self.calib.emissivity == 1:
-        ta_r = (ta_abs + TEMP_K)**4
-#         else:
-#             tr = tr if tr is not None else ta_abs - 8
-#             ta_k4 = (ta_abs + TEMP_K)**4
-#             tr_k4 = (tr + TEMP_K)**4
-#             ta_r = tr_k4 - (tr_k4 - ta_k4)/self.calib.emissivity
+        if self.calib is None or self.calib.emissivity == 1:
+            ta_r = (ta_abs + TEMP_K)**4
+        else:
+            tr = tr if tr is not None else ta_abs - 8
+            ta_k4 = (ta_abs + TEMP_K)**4
+            tr_k4 = (tr + TEMP_K)**4
+            ta_r = tr_k4 - (tr_k4 - ta_k4)/self.calib.emissivity
 
         return CameraState(
             vdd = self.read_vdd(),
@@ -201,6 +234,14 @@ class MLX90640:
         )
 
 
+    def read_status(self):
+        """!
+        Read the status register once; @c data_available and
+        @c last_subpage can then be looked up in the result.
+        """
+        return self.registers.read_register('data_available')
+
+
     @property
     def has_data(self):
         """!
@@ -216,14 +257,17 @@ class MLX90640:
         return self.registers['last_subpage']
 
 
-    def read_image(self, sp_id = None):
+    def read_image(self, sp_id = None, status = None):
         """!
+        Read the subpage the camera has ready. @c status may be a result of
+        read_status() which the caller has already checked.
         """
-        if not self.has_data:
+        status = status or self.read_status()
+        if not status['data_available']:
             raise DataNotAvailableError
 
         if sp_id is None:
-            sp_id = self.last_subpage
+            sp_id = status['last_subpage']
 
         subpage = Subpage(self.get_pattern(), sp_id)
         self.last_read = subpage
@@ -234,21 +278,20 @@ class MLX90640:
         return self.raw
 
 
-#     def process_image(self, sp_id = None, state = None):
-#         """!
-#         """
-#         if self.last_read is None:
-#             raise DataNotAvailableError
-# 
-#         subpage = self.last_read
-#         if sp_id is not None:
-#             subpage.id = sp_id
-# 
-#         state = state or self.read_state()
-# 
-#         # print(f"process SP {subpage.id}")
-#         raw_data = ((idx, self.raw[idx]) for idx in subpage.sp_range())
-#         self.image.update(raw_data, subpage, state)
-#         return self.image
+    def process_image(self, sp_id = None, state = None):
+        """!
+        Compensate the subpage last read by read_image() into @c image.
+        Requires a calibrated setup().
+        """
+        if self.last_read is None:
+            raise DataNotAvailableError
+
+        subpage = self.last_read
+        if sp_id is not None:
+            subpage.id = sp_id
 
+        state = state or self.read_state()
 
+        # print(f"process SP {subpage.id}")
+        self.image.update(self.raw, subpage, state)
+        return self.image
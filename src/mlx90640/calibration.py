@@ -1,10 +1,13 @@
 from array import array
+from binascii import crc32
+from struct import pack, unpack, calcsize
 from mlx90640.utils import (
     Struct, 
     StructProto,
     field_desc,
+    array_filled,
 )
-from mlx90640.regmap import REG_SIZE
+from mlx90640.regmap import REG_SIZE, EEPROM_ADDRESS, EEPROM_SIZE
 
 NUM_ROWS = const(24)
 NUM_COLS = const(32)
@@ -59,16 +62,16 @@ class PixelCalibrationData:
         pix_count = NUM_ROWS * NUM_COLS
         self._data = bytearray(pix_count * REG_SIZE)
 
-        failed = []
-        buf = bytearray(REG_SIZE)
-        for idx in range(pix_count):
-            offset = idx * REG_SIZE
-            iface.read_into(PIX_CALIB_ADDRESS + offset, buf)
-            if buf != bytes(REG_SIZE):
-                self._data[offset:offset+REG_SIZE] = buf
-            else:
-                failed.append(idx)
-        self.failed = tuple(failed)
+        # one block read covers all pixel words; with an EepromImage this is
+        # just a copy out of the snapshot
+        iface.read_into(PIX_CALIB_ADDRESS, self._data)
+
+        # a blank calibration word marks a failed pixel
+        data = self._data
+        self.failed = tuple(
+            idx for idx in range(pix_count)
+            if not (data[idx*REG_SIZE] or data[idx*REG_SIZE + 1])
+        )
 
     def __len__(self):
         return len(self._data)//REG_SIZE
@@ -81,8 +84,34 @@ class PixelCalibrationData:
 
 TEMP_K = 273.15
 
+## Calibration cache file layout
+# header: magic, format version, pixel count, EEPROM CRC, payload CRC
+# payload: pix_os_ref ('h'), os_kta, pix_alpha, il_offset ('f'), each
+# IMAGE_SIZE items in native byte order
+CACHE_MAGIC = b'MLXC'
+CACHE_VERSION = const(2)
+CACHE_HEADER_FMT = '<4sHHII'
+CACHE_ARRAYS = (
+    ('pix_os_ref', 'h'),
+    ('os_kta',     'f'),
+    ('pix_alpha',  'f'),
+    ('il_offset',  'f'),
+)
+
+def eeprom_crc(iface):
+    # identifies the device calibration; works on the camera or an EepromImage
+    buf = bytearray(0x20 * REG_SIZE)
+    crc = 0
+    for start in range(0, EEPROM_SIZE, 0x20):
+        iface.read_into(EEPROM_ADDRESS + start, buf)
+        crc = crc32(buf, crc)
+    return crc
+
 class CameraCalibration:
-    def __init__(self, iface, eeprom, *, emissivity=1, use_tgc=False):
+    def __init__(self, iface, eeprom, *, emissivity=1, use_tgc=False,
+                 cache=None):
+        # cache is the name of a calibration cache file; it is used if it
+        # matches this camera's EEPROM and (re)written otherwise
         self.emissivity = emissivity
 
         # restore VDD sensor parameters
@@ -103,13 +132,11 @@ class CameraCalibration:
 
         # pixel calibration data
         self.pix_data = PixelCalibrationData(iface)
-        self.pix_os_ref = array('h', self._calc_pix_os_ref(iface, eeprom))
         self.outliers = tuple(idx for idx, data in enumerate(self.pix_data) if data['outlier'])
 
         # IR data compensation
         self.kta_scale_1 = 1 << (eeprom['kta_scale_1'] + 8)
         self.kta_scale_2 = 1 << eeprom['kta_scale_2']
-        self.pix_kta = array('f', self._calc_pix_kta(eeprom))
 
         self.kv_scale = 1 << eeprom['kv_scale']
         self.kv_avg = (
@@ -134,7 +161,6 @@ class CameraCalibration:
             self.kv_cp = eeprom['kv_cp'] / self.kv_scale
 
         # sensitivity normalization
-        self.pix_alpha = array('f', self._calc_pix_alpha_ref(iface, eeprom))
         self.ksta = eeprom['ksta'] / 8192.0
 
         if use_tgc:
@@ -148,7 +174,17 @@ class CameraCalibration:
         self.il_chess_c1 = eeprom['il_chess_c1'] / 16.0
         self.il_chess_c2 = eeprom['il_chess_c2'] / 2.0
         self.il_chess_c3 = eeprom['il_chess_c3'] / 8.0
-        self.il_offset = array('f', self._calc_il_offset())
+
+        # per-pixel arrays: pix_os_ref, os_kta, pix_alpha, il_offset. kta is
+        # only ever used multiplied by the offset, so only the product is kept
+        key = eeprom_crc(iface) if cache else None
+        if not (cache and self._load_cache(cache, key)):
+            self.pix_os_ref = array('h', self._calc_pix_os_ref(iface, eeprom))
+            self.os_kta = array('f', self._calc_os_kta(eeprom))
+            self.pix_alpha = array('f', self._calc_pix_alpha_ref(iface, eeprom))
+            self.il_offset = array('f', self._calc_il_offset())
+            if cache:
+                self._save_cache(cache, key)
 
         # temperature calculation
         self.drift = 0  # temperature drift correction
@@ -173,6 +209,53 @@ class CameraCalibration:
         alpha_4 = alpha_3*(1.0 + ksto3*(ct4 - ct3))
         self.alpha_ext = (alpha_1, alpha_2, alpha_3, alpha_4)
 
+    def _load_cache(self, filename, key):
+        header = bytearray(calcsize(CACHE_HEADER_FMT))
+        arrays = []
+        crc = 0
+        try:
+            with open(filename, 'rb') as file:
+                if file.readinto(header) != len(header):
+                    return False
+                magic, version, count, eeprom_key, payload_crc = unpack(
+                    CACHE_HEADER_FMT, header)
+                if (magic != CACHE_MAGIC or version != CACHE_VERSION
+                        or count != IMAGE_SIZE or eeprom_key != key):
+                    return False
+
+                # read straight into preallocated arrays to avoid building
+                # intermediate objects on the heap
+                for name, typecode in CACHE_ARRAYS:
+                    data = array_filled(typecode, IMAGE_SIZE)
+                    if file.readinto(data) != IMAGE_SIZE * calcsize(typecode):
+                        return False
+                    crc = crc32(data, crc)
+                    arrays.append(data)
+        except OSError:
+            return False
+
+        if crc != payload_crc:
+            return False
+
+        for (name, _), data in zip(CACHE_ARRAYS, arrays):
+            setattr(self, name, data)
+        return True
+
+    def _save_cache(self, filename, key):
+        crc = 0
+        for name, _ in CACHE_ARRAYS:
+            crc = crc32(getattr(self, name), crc)
+        header = pack(CACHE_HEADER_FMT, CACHE_MAGIC, CACHE_VERSION,
+                      IMAGE_SIZE, key, crc)
+        try:
+            with open(filename, 'wb') as file:
+                file.write(header)
+                for name, _ in CACHE_ARRAYS:
+                    file.write(getattr(self, name))
+        except OSError:
+            # a read-only or full filesystem only costs us the speedup
+            pass
+
     def _calc_pix_os_ref(self, iface, eeprom):
         offset_avg = eeprom['pix_os_average']
         occ_scale_row = 1 << eeprom['scale_occ_row']
@@ -226,6 +309,10 @@ class CameraCalibration:
                 kta_rc = kta_avg[row % 2][col % 2]
                 yield (kta_rc + kta_ee * self.kta_scale_2)/self.kta_scale_1
 
+    def _calc_os_kta(self, eeprom):
+        for os_ref, kta in zip(self.pix_os_ref, self._calc_pix_kta(eeprom)):
+            yield os_ref * kta
+
     def _calc_il_offset(self):
         for idx in range(NUM_ROWS*NUM_COLS):
             il_pattern = idx//32 - (idx//64)*2
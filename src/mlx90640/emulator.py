@@ -0,0 +1,243 @@
+"""!
+@file emulator.py
+This file contains an emulated MLX90640 which stands in for @c machine.I2C,
+so the driver can be run, tested and benchmarked without a camera.
+
+The emulator keeps the camera's EEPROM, RAM and control registers in
+memory and answers the same @c scan(), @c readfrom_mem(),
+@c readfrom_mem_into() and @c writeto_mem() calls as @c machine.I2C. New
+subpages are measured at the configured refresh rate from a heat scene and
+announced through the status register like the real device. Every
+transaction is counted, so the cost of a driver change in I2C traffic can
+be measured directly.
+"""
+
+import math
+import utime
+from mlx90640.utils import array_filled
+from mlx90640.regmap import REG_SIZE, EEPROM_ADDRESS, EEPROM_SIZE
+from mlx90640.calibration import NUM_ROWS, NUM_COLS, IMAGE_SIZE
+from mlx90640.image import PIX_DATA_ADDRESS, get_pattern_by_id
+
+CAMERA_ADDRESS = const(0x33)
+
+# RAM holds the pixels followed by two rows of auxiliary measurements
+RAM_SIZE = const(0x340)
+
+STATUS_REGISTER = const(0x8000)
+CONTROL_REGISTER = const(0x800D)
+REGISTER_SIZE = const(0x20)
+
+# status register bits
+_LAST_SUBPAGE = const(0x0007)
+_DATA_AVAILABLE = const(0x0008)
+_OVERWRITE_ENABLE = const(0x0010)
+
+# power-on control register: subpages on, 2 Hz, 18 bit, chess pattern
+CONTROL_DEFAULT = const(0x1901)
+
+# typical auxiliary readings, in RAM word address order
+AUX_DEFAULTS = {
+    0x0700: 19500,   # ta_vbe
+    0x0708: -80,     # cp_sp_0
+    0x070A: 6300,    # gain
+    0x0720: 1700,    # ta_ptat
+    0x0728: -60,     # cp_sp_1
+    0x072A: -13000,  # vdd_pix
+}
+
+_ENODEV = const(19)
+_EIO = const(5)
+
+
+class HotSpotScene:
+    """!
+    A warm round target on a uniform background, optionally moving.
+
+    Calling the scene with a time in seconds fills a 768-pixel buffer with
+    raw pixel values. The position is in pixels, with x across and y down
+    the unmirrored image.
+    """
+
+    def __init__(self, x=16.0, y=12.0, vx=0.0, vy=0.0, radius=1.5,
+                 peak=600, background=0):
+        self.x = x
+        self.y = y
+        self.vx = vx
+        self.vy = vy
+        self.radius = radius
+        self.peak = peak
+        self.background = background
+
+    def position(self, t):
+        return self.x + self.vx * t, self.y + self.vy * t
+
+    def __call__(self, t, pix):
+        cx, cy = self.position(t)
+        scale = -0.5 / (self.radius * self.radius)
+        for row in range(NUM_ROWS):
+            dy2 = (row - cy) ** 2
+            base = row * NUM_COLS
+            for col in range(NUM_COLS):
+                heat = math.exp(((col - cx) ** 2 + dy2) * scale)
+                pix[base + col] = int(self.background + self.peak * heat)
+
+
+class EmulatedCamera:
+    """!
+    An I2C bus with a single emulated MLX90640 on it.
+
+    @c scene is called as @c scene(t, pix) to fill a 768-pixel buffer with
+    raw values for a time @c t in seconds, or may be any sequence of 768
+    values for a still scene. When @c realtime is set, subpages are measured
+    as time passes on @c clock, at the refresh rate in the control register;
+    otherwise they are measured only when @c measure() is called.
+    """
+
+    def __init__(self, scene=None, eeprom=None, addr=CAMERA_ADDRESS,
+                 realtime=True, clock=utime.ticks_us):
+        self.addr = addr
+        self.scene = scene
+        self.realtime = realtime
+        self.clock = clock
+
+        self.ram = array_filled('H', RAM_SIZE)
+        for address, value in AUX_DEFAULTS.items():
+            self.ram[address - PIX_DATA_ADDRESS] = value & 0xFFFF
+        self.registers = array_filled('H', REGISTER_SIZE)
+        self.registers[CONTROL_REGISTER - STATUS_REGISTER] = CONTROL_DEFAULT
+        self.eeprom = array_filled('H', EEPROM_SIZE)
+        if eeprom is not None:
+            self.load_eeprom(eeprom)
+
+        self._scene_pix = array_filled('h', IMAGE_SIZE)
+        self._next_subpage = 0
+        self._start = clock()
+        self._last_due = 0
+        self.reset_counters()
+
+    def load_eeprom(self, data):
+        """!
+        Fill the EEPROM from big-endian words, such as @c EepromImage.data.
+        """
+        data = getattr(data, 'data', data)
+        for idx in range(EEPROM_SIZE):
+            self.eeprom[idx] = data[2 * idx] << 8 | data[2 * idx + 1]
+        # the control register is loaded from EEPROM at power on
+        control = self.eeprom[0x240C - EEPROM_ADDRESS]
+        if control:
+            self.registers[CONTROL_REGISTER - STATUS_REGISTER] = control
+
+    def reset_counters(self):
+        """!
+        Zero the transaction counters.
+        """
+        self.reads = 0
+        self.writes = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.subpages = 0
+        self.overruns = 0
+
+    @property
+    def transactions(self):
+        return self.reads + self.writes
+
+    @property
+    def subpage_period(self):
+        """!
+        Time between subpages in microseconds at the current refresh rate.
+        """
+        control = self.registers[CONTROL_REGISTER - STATUS_REGISTER]
+        rate = control >> 7 & 7
+        return int(1000000 / 2.0**(rate - 1))
+
+    def measure(self):
+        """!
+        Measure the next subpage from the scene into RAM and flag it in the
+        status register. If the last subpage hasn't been collected and
+        overwriting is disabled, the measurement is discarded as on the
+        real device.
+        """
+        status = self.registers[0]
+        sp_id = self._next_subpage
+        self._next_subpage ^= 1
+        self.subpages += 1
+        if status & _DATA_AVAILABLE and not status & _OVERWRITE_ENABLE:
+            self.overruns += 1
+            return
+
+        pix = self._scene_pix
+        scene = self.scene
+        if callable(scene):
+            scene(utime.ticks_diff(self.clock(), self._start) / 1000000, pix)
+        elif scene is not None:
+            for idx in range(IMAGE_SIZE):
+                pix[idx] = scene[idx]
+
+        control = self.registers[CONTROL_REGISTER - STATUS_REGISTER]
+        pattern = get_pattern_by_id(control >> 12 & 1)
+        for idx in pattern.sp_range(sp_id):
+            self.ram[idx] = pix[idx] & 0xFFFF
+
+        self.registers[0] = (status & ~_LAST_SUBPAGE) | _DATA_AVAILABLE | sp_id
+
+    def _update(self):
+        # measure the subpages which have fallen due since the last access
+        if not self.realtime:
+            return
+        due = utime.ticks_diff(self.clock(), self._start) // self.subpage_period
+        while self._last_due < due:
+            self._last_due += 1
+            self.measure()
+
+    def _word(self, address):
+        if PIX_DATA_ADDRESS <= address < PIX_DATA_ADDRESS + RAM_SIZE:
+            return self.ram[address - PIX_DATA_ADDRESS]
+        if EEPROM_ADDRESS <= address < EEPROM_ADDRESS + EEPROM_SIZE:
+            return self.eeprom[address - EEPROM_ADDRESS]
+        if STATUS_REGISTER <= address < STATUS_REGISTER + REGISTER_SIZE:
+            return self.registers[address - STATUS_REGISTER]
+        raise OSError(_EIO)
+
+    def _check(self, addr, nbytes, addrsize):
+        if addr != self.addr:
+            raise OSError(_ENODEV)
+        if addrsize != 16 or nbytes % REG_SIZE:
+            raise OSError(_EIO)
+
+    # machine.I2C interface
+
+    def scan(self):
+        return [self.addr]
+
+    def readfrom_mem(self, addr, memaddr, nbytes, *, addrsize=8):
+        buf = bytearray(nbytes)
+        self.readfrom_mem_into(addr, memaddr, buf, addrsize=addrsize)
+        return bytes(buf)
+
+    def readfrom_mem_into(self, addr, memaddr, buf, *, addrsize=8):
+        self._check(addr, len(buf), addrsize)
+        self._update()
+        for idx in range(0, len(buf), REG_SIZE):
+            word = self._word(memaddr + idx // REG_SIZE)
+            buf[idx] = word >> 8
+            buf[idx + 1] = word & 0xFF
+        self.reads += 1
+        self.bytes_read += len(buf)
+
+    def writeto_mem(self, addr, memaddr, buf, *, addrsize=8):
+        self._check(addr, len(buf), addrsize)
+        self._update()
+        for idx in range(0, len(buf), REG_SIZE):
+            address = memaddr + idx // REG_SIZE
+            word = buf[idx] << 8 | buf[idx + 1]
+            if address == STATUS_REGISTER:
+                # only the flags can be written; last_subpage is read-only
+                status = self.registers[0]
+                word = (status & _LAST_SUBPAGE) | (word & (_DATA_AVAILABLE | _OVERWRITE_ENABLE))
+            elif not STATUS_REGISTER < address < STATUS_REGISTER + REGISTER_SIZE:
+                raise OSError(_EIO)
+            self.registers[address - STATUS_REGISTER] = word
+        self.writes += 1
+        self.bytes_written += len(buf)
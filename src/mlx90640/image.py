@@ -3,15 +3,15 @@
 This file contains image storage and processing classes for the MLX90640 camera
 driver.
 
-RAW VERSION
-This version is a stripped down MLX90640 driver which produces only raw data,
-not calibrated data, in order to save memory.
+RawImage holds the raw subpage data; ProcessedImage turns it into
+calibrated values using folded, preallocated per-pixel coefficients.
 """
 
 import math
-import struct
+import sys
 from array import array
 from ucollections import namedtuple
+from uctypes import addressof, bytearray_at
 from mlx90640.utils import (
     Struct,
     StructProto,
@@ -20,18 +20,43 @@ from mlx90640.utils import (
 )
 
 from mlx90640.regmap import REG_SIZE
-from mlx90640.calibration import NUM_COLS, IMAGE_SIZE, TEMP_K
+from mlx90640.calibration import NUM_ROWS, NUM_COLS, IMAGE_SIZE, TEMP_K
 
 PIX_STRUCT_FMT = '>h'
 PIX_DATA_ADDRESS = const(0x0400)
 
+# offsets within a big-endian pixel word of the bytes which come first and
+# second in a native 16-bit integer
+if sys.byteorder == 'little':
+    _NATIVE_B0, _NATIVE_B1 = 1, 0
+else:
+    _NATIVE_B0, _NATIVE_B1 = 0, 1
+
+# number of pixel RAM rows fetched per I2C transaction by RawImage.read();
+# it must divide NUM_ROWS. NUM_ROWS reads the whole 0x0400-0x06FF block at
+# once, 0 reads one pixel register per transaction
+BURST_ROWS = const(1)
+
 class _BasePattern:
+    # per-subpage pixel index tables, built on first use by _build_tables()
+    _sp_tables = None
+
     @classmethod
     def sp_range(cls, sp_id):
-        return (
-            idx for idx, sp in enumerate(cls.iter_sp()) 
-            if sp == sp_id
+        tables = cls._sp_tables
+        if tables is None:
+            tables = cls._build_tables()
+        return tables[sp_id]
+
+    @classmethod
+    def _build_tables(cls):
+        # each subpage holds exactly half the pixels, in ascending order
+        tables = (
+            array('H', (idx for idx, sp in enumerate(cls.iter_sp()) if sp == 0)),
+            array('H', (idx for idx, sp in enumerate(cls.iter_sp()) if sp == 1)),
         )
+        cls._sp_tables = tables
+        return tables
 
     @classmethod
     def iter_sp(cls):
@@ -73,18 +98,117 @@ class Subpage:
 ## Image Buffers
 
 class RawImage:
-    def __init__(self):
+    """ Raw signed 16-bit pixel data, stored in native byte order in @c pix.
+
+    Pixel words arrive big-endian from the bus; read() decodes them by
+    swapping the two bytes straight into the memory of @c pix, so a frame
+    read allocates nothing. @c view exports @c pix through the buffer
+    protocol for consumers which want to read it without a copy.
+    """
+    def __init__(self, burst_rows=BURST_ROWS):
         self.pix = array_filled('h', IMAGE_SIZE)
+        self.view = memoryview(self.pix)
+
+        # byte-level alias of pix, used as the decode target
+        self._pix_bytes = bytearray_at(addressof(self.pix), IMAGE_SIZE * REG_SIZE)
+
+        # burst reads go through one preallocated buffer covering a block of
+        # whole pixel RAM rows; the blocks must tile the pixel RAM exactly,
+        # or the last one would run on into the auxiliary data at 0x0700
+        if burst_rows < 0 or burst_rows > NUM_ROWS or (
+                burst_rows and NUM_ROWS % burst_rows):
+            raise ValueError(f"burst_rows must be 0 or a divisor of {NUM_ROWS}")
+        self.burst_rows = burst_rows
+        self._burst_buf = bytearray(max(burst_rows * NUM_COLS, 1) * REG_SIZE)
 
     def __getitem__(self, idx):
         return self.pix[idx]
 
+    def __len__(self):
+        return IMAGE_SIZE
+
     def read(self, iface, update_idx = None):
-        buf = bytearray(REG_SIZE)
+        # update_idx must be in ascending order, as produced by sp_range()
         update_idx = update_idx or range(IMAGE_SIZE)
+        if self.burst_rows:
+            self._read_burst(iface, update_idx)
+        else:
+            self._read_single(iface, update_idx)
+
+    def _read_single(self, iface, update_idx):
+        buf = self._burst_buf
+        pix_bytes = self._pix_bytes
         for offset in update_idx:
             iface.read_into(PIX_DATA_ADDRESS + offset, buf)
-            self.pix[offset] = struct.unpack(PIX_STRUCT_FMT, buf)[0]
+            dst = offset * REG_SIZE
+            pix_bytes[dst] = buf[_NATIVE_B0]
+            pix_bytes[dst + 1] = buf[_NATIVE_B1]
+
+    def _read_burst(self, iface, update_idx):
+        # Fetch each block of rows that holds at least one requested pixel in
+        # a single transaction, then scatter only the requested pixels out of
+        # it. Rows without any requested pixels (e.g. every other row of an
+        # interleaved subpage) are never read.
+        buf = self._burst_buf
+        pix_bytes = self._pix_bytes
+        b0 = _NATIVE_B0
+        b1 = _NATIVE_B1
+        block_size = self.burst_rows * NUM_COLS
+        block_start = -1
+        for offset in update_idx:
+            start = offset - offset % block_size
+            if start != block_start:
+                block_start = start
+                iface.read_into(PIX_DATA_ADDRESS + start, buf)
+            src = (offset - start) * REG_SIZE
+            dst = offset * REG_SIZE
+            pix_bytes[dst] = buf[src + b0]
+            pix_bytes[dst + 1] = buf[src + b1]
+
+
+class FramePool:
+    """ Fixed pool of RawImage slots for pipelined acquisition.
+
+    Acquisition reads subpages into @c filling while consumers use
+    @c latest, the most recently completed frame. publish() hands the filled
+    slot over and moves acquisition to the next slot, seeding it with the
+    completed frame so the other subpage carries over. Nothing is allocated
+    after construction.
+    """
+    def __init__(self, slots=2, burst_rows=BURST_ROWS):
+        if slots < 2:
+            raise ValueError("a frame pool needs at least 2 slots")
+        self._frames = tuple(RawImage(burst_rows) for _ in range(slots))
+        self._fill = 0
+        self._done = -1
+        # sequence number of the latest complete frame, 0 before the first
+        self.seq = 0
+
+    @property
+    def filling(self):
+        return self._frames[self._fill]
+
+    @property
+    def latest(self):
+        if self._done < 0:
+            return None
+        return self._frames[self._done]
+
+    def publish(self):
+        done = self._fill
+        fill = done + 1
+        if fill >= len(self._frames):
+            fill = 0
+        # copy with a plain index loop, since slicing would allocate a slice
+        # object on every frame
+        dst = self._frames[fill].pix
+        src = self._frames[done].pix
+        for idx in range(IMAGE_SIZE):
+            dst[idx] = src[idx]
+        self._done = done
+        self._fill = fill
+        self.seq += 1
+        return self.seq
 
 
 ImageLimits = namedtuple('ScaleLimits', ('min_h', 'max_h', 'min_idx', 'max_idx'))
@@ -96,123 +220,119 @@ _INTERP_NEIGHBOURS = tuple(
     if row != 0 or col != 0
 )
 
-# class ProcessedImage:
-#     def __init__(self, calib):
-#         # pix_data should be a sequence of ints
-#         self.calib = calib
-#         self.v_ir = array_filled('f', IMAGE_SIZE, 0.0)
-#         self.alpha = array_filled('f', IMAGE_SIZE, 1.0)
-#         self.buf = array_filled('f', IMAGE_SIZE, 1.0)
-# 
-#     def update(self, pix_data, subpage, state):
-#         if self.calib.use_tgc:
-#             pix_os_cp = self._calc_os_cp(subpage, state)
-#             pix_alpha_cp = self.calib.pix_alpha_cp[subpage.id]
-# 
-#         for idx, raw in pix_data:
-#             ## IR data compensation - offset, Vdd, and Ta
-#             kta = self.calib.pix_kta[idx]
-# 
-#             row, col = divmod(idx, NUM_COLS)
-#             kv = self.calib.kv_avg[row % 2][col % 2]
-#             
-#             offset = self.calib.pix_os_ref[idx]
-#             offset *= (1 + kta*state.ta)*(1 + kv*state.vdd)
-# 
-#             v_os = raw*state.gain - offset
-#             if subpage.pattern is InterleavedPattern:
-#                 v_os += self.calib.il_offset[idx]
-#             v_ir = v_os / self.calib.emissivity
-# 
-#             ## IR data gradient compensation
-#             if self.calib.use_tgc:
-#                 v_ir -= self.calib.tgc*pix_os_cp
-# 
-#             # preserve v_ir for temperature calculations
-#             self.v_ir[idx] = v_ir
-# 
-#             alpha = self._calc_alpha(idx, state.ta)
-#             self.buf[idx] = v_ir/alpha
-# 
-#     def _calc_os_cp(self, subpage, state):
-#         pix_os_cp = self.calib.pix_os_cp[subpage.id]
-#         if subpage.pattern is InterleavedPattern:
-#             pix_os_cp += self.calib.il_chess_c1
-#         return state.gain_cp[subpage.id] - pix_os_cp*(1 + self.calib.kta_cp*state.ta)*(1 + self.calib.kv_cp*state.vdd)
-# 
-#     def _calc_os_cp2(self, pattern, state):
-#         pix_os_cp = list(self.calib.pix_os_cp)
-#         if pattern is InterleavedPattern:
-#             for i in range(len(pix_os_cp)):
-#                 pix_os_cp[i] += self.calib.il_chess_c1
-# 
-#         k = (1 + self.calib.kta_cp*state.ta)*(1 + self.calib.kv_cp*state.vdd)
-#         return [
-#             gain_cp_sp - pix_os_cp_sp*k
-#             for pix_os_cp_sp, gain_cp_sp in zip(pix_os_cp, state.gain_cp)
-#         ]
-# 
-#     def _calc_alpha(self, idx, ta):
-#         alpha = self.calib.pix_alpha[idx]
-#         if self.calib.use_tgc:
-#             alpha -= self.calib.tgc*pix_alpha_cp
-#         alpha *= (1 + self.calib.ksta*ta)
-#         return alpha
-# 
-#     def _calc_to(self, idx, alpha, ta_r):
-#         v_ir = self.v_ir[idx]
-# 
-#         s_x = v_ir*(alpha**3) + ta_r*(alpha**4)
-#         s_x = math.sqrt(math.sqrt(s_x))*self.calib.ksto[1]
-# 
-#         to = v_ir/(alpha*(1 - TEMP_K*self.calib.ksto[1]) + s_x) + ta_r
-#         to = math.sqrt(math.sqrt(to)) - TEMP_K
-#         return to + self.calib.drift
-# 
-#     def calc_temperature(self, idx, state):
-#         alpha = self._calc_alpha(idx, state.ta)
-#         return self._calc_to(idx, alpha, state.ta_r)
-# 
-#     def calc_temperature_ext(self, idx, state):
-#         v_ir = self.v_ir[idx]
-#         alpha = self._calc_alpha(idx, state.ta)
-#         to = self._calc_to(idx, alpha, state.ta_r)
-# 
-#         band = self._get_range_band(to)
-#         if band < 0:
-#             return self.calib.ct[0]
-# 
-#         alpha_ext = self.calib.alpha_ext[band]
-#         ksto_ext = self.calib.ksto[band]
-#         ct = self.calib.ct[band]
-#         to_ext = v_ir/(alpha*alpha_ext*(1 + ksto_ext*(to - ct))) + state.ta_r
-#         to_ext = math.sqrt(math.sqrt(to_ext)) - TEMP_K
-#         return to_ext  + self.calib.drift
-# 
-#     def _get_range_band(self, t):
-#         return sum(1 for ct in self.calib.ct if t >= ct) - 1
-# 
-#     def calc_limits(self, *, exclude_idx=()):
-#         # find min/max in place to keep mem usage down
-#         min_h, min_idx = None, None
-#         max_h, max_idx = None, None
-#         for idx, h in enumerate(self.buf):
-#             if idx in exclude_idx:
-#                 continue
-#             if min_h is None or h < min_h:
-#                 min_h, min_idx = h, idx
-#             if max_h is None or h > max_h:
-#                 max_h, max_idx = h, idx
-#         return ImageLimits(min_h, max_h, min_idx, max_idx)
-# 
-#     def interpolate_bad_pixels(self, bad_pixels):
-#         for bad_idx in bad_pixels:
-#             count = 0
-#             total = 0
-#             for offset in _INTERP_NEIGHBOURS:
-#                 idx = bad_idx + offset
-#                 if idx in range(IMAGE_SIZE) and idx not in bad_pixels:
-#                     count += 1
-#                     total += self.buf[idx]
-#             if count > 0:
-#                 self.buf[bad_idx] = total/count
+class ProcessedImage:
+    """ Calibrated image, updated one subpage at a time.
+
+    The per-pixel calibration constants are folded at construction into
+    preallocated coefficient arrays so that update() is a single loop of
+    float arithmetic with no per-pixel allocation:
+
+        offset = kv(row % 2, col % 2) * (pix_os_ref + os_kta*ta)
+        buf    = ((raw*gain - offset [+ il_offset])/emissivity - tgc*os_cp)
+                 / ((pix_alpha - tgc*alpha_cp)*(1 + ksta*ta))
+
+    RAM budget (IMAGE_SIZE = 768 pixels):
+        buf               'f'  3072 B  compensated IR signal, v_ir/alpha
+        calib.pix_os_ref  'h'  1536 B
+        calib.os_kta      'f'  3072 B  pix_os_ref * kta, folded by the calibration
+        calib.pix_alpha   'f'  3072 B
+        calib.il_offset   'f'  3072 B
+    13824 B in all, of which only buf belongs to the image; the calibration
+    arrays are shared, not copied, and kta isn't kept on its own. v_ir and
+    the compensated alpha are not stored; calc_temperature() recovers them
+    from buf.
+    """
+    def __init__(self, calib):
+        self.calib = calib
+        self.buf = array_filled('f', IMAGE_SIZE, 0.0)
+
+    def __getitem__(self, idx):
+        return self.buf[idx]
+
+    def update(self, raw, subpage, state):
+        calib = self.calib
+        ta = state.ta
+        gain = state.gain
+
+        # kv compensation factors, indexed by (row % 2)*2 + col % 2
+        vdd = state.vdd
+        (kv_ee, kv_eo), (kv_oe, kv_oo) = calib.kv_avg
+        kv = (1 + kv_ee*vdd, 1 + kv_eo*vdd, 1 + kv_oe*vdd, 1 + kv_oo*vdd)
+
+        os_cp = 0.0
+        alpha_cp = 0.0
+        if calib.use_tgc:
+            os_cp = calib.tgc*self._calc_os_cp(subpage, state)
+            alpha_cp = calib.tgc*calib.pix_alpha_cp[subpage.id]
+
+        emissivity = calib.emissivity
+        ksta = 1 + calib.ksta*ta
+        interleaved = subpage.pattern is InterleavedPattern
+
+        pix = raw.pix
+        os_ref = calib.pix_os_ref
+        os_kta = calib.os_kta
+        alpha = calib.pix_alpha
+        il_offset = calib.il_offset
+        buf = self.buf
+        for idx in subpage.sp_range():
+            v_os = pix[idx]*gain - kv[(idx >> 4 & 2) | (idx & 1)]*(os_ref[idx] + os_kta[idx]*ta)
+            if interleaved:
+                v_os += il_offset[idx]
+            buf[idx] = (v_os/emissivity - os_cp) / ((alpha[idx] - alpha_cp)*ksta)
+
+    def _calc_os_cp(self, subpage, state):
+        calib = self.calib
+        pix_os_cp = calib.pix_os_cp[subpage.id]
+        if subpage.pattern is InterleavedPattern:
+            pix_os_cp += calib.il_chess_c1
+        return state.gain_cp[subpage.id] - pix_os_cp*(1 + calib.kta_cp*state.ta)*(1 + calib.kv_cp*state.vdd)
+
+    def calc_temperature(self, subpage, state, out):
+        """ Write the object temperature (degC) of every pixel in the subpage
+        most recently passed to update() into out[idx]. out may be buf itself
+        to convert in place.
+        """
+        calib = self.calib
+        ksto = calib.ksto[1]
+        ta_r = state.ta_r
+        drift = calib.drift - TEMP_K
+        k_to = 1 - TEMP_K*ksto
+        ksta = 1 + calib.ksta*state.ta
+        alpha_cp = calib.tgc*calib.pix_alpha_cp[subpage.id] if calib.use_tgc else 0.0
+
+        alpha = calib.pix_alpha
+        buf = self.buf
+        sqrt = math.sqrt
+        for idx in subpage.sp_range():
+            alpha_comp = (alpha[idx] - alpha_cp)*ksta
+            v_ir = buf[idx]*alpha_comp
+            a3 = alpha_comp*alpha_comp*alpha_comp
+            s_x = sqrt(sqrt(v_ir*a3 + ta_r*a3*alpha_comp))*ksto
+            to = v_ir/(alpha_comp*k_to + s_x) + ta_r
+            out[idx] = sqrt(sqrt(to)) + drift
+
+    def calc_limits(self, *, exclude_idx=()):
+        # find min/max in place to keep mem usage down
+        min_h, min_idx = None, None
+        max_h, max_idx = None, None
+        for idx, h in enumerate(self.buf):
+            if idx in exclude_idx:
+                continue
+            if min_h is None or h < min_h:
+                min_h, min_idx = h, idx
+            if max_h is None or h > max_h:
+                max_h, max_idx = h, idx
+        return ImageLimits(min_h, max_h, min_idx, max_idx)
+
+    def interpolate_bad_pixels(self, bad_pixels):
+        for bad_idx in bad_pixels:
+            count = 0
+            total = 0
+            for offset in _INTERP_NEIGHBOURS:
+                idx = bad_idx + offset
+                if idx in range(IMAGE_SIZE) and idx not in bad_pixels:
+                    count += 1
+                    total += self.buf[idx]
+            if count > 0:
+                self.buf[bad_idx] = total/count
@@ -0,0 +1,235 @@
+"""!
+@file recording.py
+This file contains a recorder which saves raw subpages to a file as they are
+read, and a replay device which serves a recording back to the driver.
+
+A recording is a short file header followed by fixed-size records, so any
+record can be found by its number without an index. Each record holds the
+@c utime.ticks_us() reading when the subpage was read, the subpage number,
+a snapshot of the yaw and pitch encoders and the subpage's 384 pixels in
+@c sp_range() order, all little-endian. The tick readings wrap as on the
+board; the player adds up the differences between successive records, so a
+recording may run for as long as the storage lasts.
+
+On a PC the file is memory-mapped, so a long session can be scanned without
+loading it all into memory.
+"""
+
+import utime
+from array import array
+from struct import pack, unpack, unpack_from, pack_into, calcsize
+from mlx90640.utils import array_filled
+from mlx90640.regmap import REG_SIZE
+from mlx90640.calibration import IMAGE_SIZE
+from mlx90640.image import ChessPattern, get_pattern_by_id
+from mlx90640.emulator import (
+    EmulatedCamera,
+    CONTROL_DEFAULT,
+    CONTROL_REGISTER,
+    STATUS_REGISTER,
+)
+
+try:
+    import mmap
+except ImportError:
+    mmap = None
+
+FILE_MAGIC = b'MLXF'
+FILE_VERSION = const(2)
+# magic, version, read pattern id, record size, reserved
+FILE_HEADER_FMT = '<4sHHHH'
+FILE_HEADER_SIZE = const(12)
+
+# ticks_us() when read, subpage id, yaw, pitch
+RECORD_HEADER_FMT = '<IBxxxll'
+RECORD_HEADER_SIZE = const(16)
+SUBPAGE_SIZE = const(IMAGE_SIZE // 2)
+RECORD_SIZE = const(RECORD_HEADER_SIZE + SUBPAGE_SIZE * REG_SIZE)
+
+_DATA_AVAILABLE = const(0x0008)
+_OVERWRITE_ENABLE = const(0x0010)
+_LAST_SUBPAGE = const(0x0007)
+
+
+class FrameRecorder:
+    """ Appends subpages to a recording as they are read. Each record is
+    built in preallocated buffers, so recording allocates nothing per
+    subpage beyond what the filesystem does.
+    """
+    def __init__(self, filename, pattern=ChessPattern):
+        self.pattern = pattern
+        self.count = 0
+        self._header = bytearray(RECORD_HEADER_SIZE)
+        self._pix = array_filled('h', SUBPAGE_SIZE)
+        self._file = open(filename, 'wb')
+        self._file.write(pack(FILE_HEADER_FMT, FILE_MAGIC, FILE_VERSION,
+                              pattern.pattern_id, RECORD_SIZE, 0))
+
+    def record(self, image, subpage, t_us, yaw=0, pitch=0):
+        """ Append the pixels of @c subpage from a raw image, read at
+        @c t_us from utime.ticks_us(), with the encoder readings then.
+        """
+        pack_into(RECORD_HEADER_FMT, self._header, 0, t_us, subpage.id, yaw, pitch)
+        pix = getattr(image, 'pix', image)
+        out = self._pix
+        n = 0
+        for idx in subpage.sp_range():
+            out[n] = pix[idx]
+            n += 1
+        self._file.write(self._header)
+        self._file.write(out)
+        self.count += 1
+
+    def flush(self):
+        self._file.flush()
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class FrameFile:
+    """ Random access to the records of a recording. The file is
+    memory-mapped where mmap is available; otherwise each record is read
+    into a preallocated buffer, which the next access overwrites.
+
+    The times of the records from the first are worked out from the wrapped
+    tick readings as they are first asked for, and kept so that later
+    lookups cost nothing.
+    """
+    def __init__(self, filename):
+        self._file = open(filename, 'rb')
+        header = self._file.read(FILE_HEADER_SIZE)
+        if len(header) != FILE_HEADER_SIZE:
+            raise ValueError(f"truncated recording: {filename}")
+        magic, version, pattern_id, record_size, _ = unpack(FILE_HEADER_FMT, header)
+        if magic != FILE_MAGIC or version != FILE_VERSION or record_size != RECORD_SIZE:
+            raise ValueError(f"not a recording: {filename}")
+        self.pattern = get_pattern_by_id(pattern_id)
+
+        size = self._file.seek(0, 2)
+        self._count = (size - FILE_HEADER_SIZE) // RECORD_SIZE
+        self._times = array('q')
+
+        if mmap is not None:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+            self._view = memoryview(self._map)
+        else:
+            self._map = None
+            self._header = bytearray(RECORD_HEADER_SIZE)
+            self._pix = array_filled('h', SUBPAGE_SIZE)
+
+    def __len__(self):
+        return self._count
+
+    def _offset(self, n):
+        if not 0 <= n < self._count:
+            raise IndexError(n)
+        return FILE_HEADER_SIZE + n * RECORD_SIZE
+
+    def header(self, n):
+        """ The ticks_us() reading, subpage id, yaw and pitch of record @c n.
+        """
+        offset = self._offset(n)
+        if self._map is not None:
+            return unpack_from(RECORD_HEADER_FMT, self._map, offset)
+        self._file.seek(offset)
+        self._file.readinto(self._header)
+        return unpack(RECORD_HEADER_FMT, self._header)
+
+    def time_us(self, n):
+        """ The time of record @c n in us from the first record.
+        """
+        self._offset(n)
+        times = self._times
+        if not times:
+            times.append(0)
+            self._last_ticks = self.header(0)[0]
+        while len(times) <= n:
+            ticks = self.header(len(times))[0]
+            times.append(times[-1] + utime.ticks_diff(ticks, self._last_ticks))
+            self._last_ticks = ticks
+        return times[n]
+
+    def pixels(self, n):
+        """ The 384 pixels of record @c n, in sp_range() order.
+        """
+        offset = self._offset(n) + RECORD_HEADER_SIZE
+        if self._map is not None:
+            return self._view[offset : offset + SUBPAGE_SIZE * REG_SIZE].cast('h')
+        self._file.seek(offset)
+        self._file.readinto(self._pix)
+        return self._pix
+
+    def close(self):
+        if self._map is not None:
+            self._view.release()
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class ReplayCamera(EmulatedCamera):
+    """ An emulated camera which measures its subpages from a recording.
+
+    With @c speed 1 the subpages become available at their recorded times,
+    and with a larger @c speed proportionally sooner. With @c speed None
+    each subpage becomes available as soon as the previous one has been
+    collected. The encoder readings and time of the subpage last served are
+    kept in @c yaw, @c pitch and @c time_us.
+    """
+    def __init__(self, frames, speed=1.0, clock=utime.ticks_us, **kwargs):
+        super().__init__(realtime=False, clock=clock, **kwargs)
+        self.frames = frames
+        self.speed = speed
+        self.position = 0
+        self.time_us = 0
+        self.yaw = 0
+        self.pitch = 0
+        control = (CONTROL_DEFAULT & ~0x1000) | frames.pattern.pattern_id << 12
+        self.registers[CONTROL_REGISTER - STATUS_REGISTER] = control
+
+    @property
+    def finished(self):
+        return self.position >= len(self.frames)
+
+    def measure(self):
+        if self.finished:
+            return
+        n = self.position
+        self.position += 1
+        self.subpages += 1
+
+        status = self.registers[0]
+        if status & _DATA_AVAILABLE and not status & _OVERWRITE_ENABLE:
+            self.overruns += 1
+            return
+
+        _, sp_id, self.yaw, self.pitch = self.frames.header(n)
+        self.time_us = self.frames.time_us(n)
+        pix = self.frames.pixels(n)
+        ram = self.ram
+        k = 0
+        for idx in self.frames.pattern.sp_range(sp_id):
+            ram[idx] = pix[k] & 0xFFFF
+            k += 1
+        self.registers[0] = (status & ~_LAST_SUBPAGE) | _DATA_AVAILABLE | sp_id
+
+    def _update(self):
+        if self.speed is None:
+            if not self.registers[0] & _DATA_AVAILABLE:
+                self.measure()
+            return
+        elapsed = utime.ticks_diff(self.clock(), self._start) * self.speed
+        while not self.finished and self.frames.time_us(self.position) <= elapsed:
+            self.measure()
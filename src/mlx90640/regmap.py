@@ -49,10 +49,17 @@ REGISTER_MAP = {
     0x072A : field_desc('vdd_pix',      FD_WORD, signed=True),
 }
 
+# Registers which only change when written by the host. These can be served
+# from a RegisterMap shadow cache; everything else (status, RAM) is volatile.
+CACHEABLE_REGISTERS = (0x800D, 0x800F, 0x8010)
+
 # Calibration Data
 EEPROM_ADDRESS = const(0x2400)
 EEPROM_SIZE    = const(0x340)
 
+# EEPROM words fetched per I2C transaction by EepromImage.dump()
+EEPROM_CHUNK   = const(0x100)
+
 # From table on page 21
 EEPROM_MAP = {
     0x2410 : (
@@ -154,12 +161,68 @@ class CameraInterface:
 
 class ReadOnlyError(Exception): pass
 
+class EepromImage:
+    """ In-memory copy of the whole camera EEPROM.
+
+    Serves the same read()/read_into() calls as CameraInterface, so it can
+    stand in for the device behind a readonly RegisterMap or the calibration
+    code. Can be dumped from the camera in a few large transfers or restored
+    from a saved blob.
+    """
+    def __init__(self, data):
+        if len(data) != EEPROM_SIZE * REG_SIZE:
+            raise ValueError(f"EEPROM image must be {EEPROM_SIZE * REG_SIZE} bytes")
+        self.data = data
+        self._view = memoryview(data)
+
+    @classmethod
+    def dump(cls, iface, chunk=EEPROM_CHUNK):
+        data = bytearray(EEPROM_SIZE * REG_SIZE)
+        view = memoryview(data)
+        for start in range(0, EEPROM_SIZE, chunk):
+            end = min(start + chunk, EEPROM_SIZE)
+            iface.read_into(EEPROM_ADDRESS + start,
+                            view[start * REG_SIZE : end * REG_SIZE])
+        return cls(data)
+
+    @classmethod
+    def load(cls, filename):
+        data = bytearray(EEPROM_SIZE * REG_SIZE)
+        with open(filename, 'rb') as file:
+            if file.readinto(data) != len(data):
+                raise ValueError(f"truncated EEPROM image: {filename}")
+        return cls(data)
+
+    def save(self, filename):
+        with open(filename, 'wb') as file:
+            file.write(self.data)
+
+    def _offset(self, mem_addr, size):
+        offset = (mem_addr - EEPROM_ADDRESS) * REG_SIZE
+        if offset < 0 or offset + size > len(self.data):
+            raise IndexError(f"address outside EEPROM: 0x{mem_addr:04X}")
+        return offset
+
+    ## raw register read/write
+
+    def read(self, mem_addr):
+        offset = self._offset(mem_addr, REG_SIZE)
+        return self.data[offset:offset+REG_SIZE]
+    def read_into(self, mem_addr, buf):
+        offset = self._offset(mem_addr, len(buf))
+        buf[:] = self._view[offset:offset+len(buf)]
+    def write(self, mem_addr, buf):
+        raise ReadOnlyError("can't write to EEPROM image")
+
 class RegisterMap:
-    def __init__(self, iface, register_map, readonly=False):
+    def __init__(self, iface, register_map, readonly=False, cached=()):
         # register_map should be a dict of { I2C address : FieldDesc(s) }
+        # cached is a collection of addresses kept in a write-through shadow
         self.iface = iface
         self.readonly = readonly
         self._fields = self._build_lookup(register_map)
+        self._cached = set(cached)
+        self._shadow = {}
 
     @staticmethod
     def _build_lookup(register_map):
@@ -186,7 +249,10 @@ class RegisterMap:
     def __getitem__(self, name):
         address, proto = self._fields[name]
 
-        buf = self.iface.read(address)
+        if address in self._cached:
+            buf = self._read_shadow(address)
+        else:
+            buf = self.iface.read(address)
         struct = Struct(buf, proto)
         return struct[name]
 
@@ -196,8 +262,48 @@ class RegisterMap:
 
         address, proto = self._fields[name]
 
-        buf = bytearray(REG_SIZE)
-        self.iface.read_into(address, buf)
+        if address in self._cached:
+            buf = self._read_shadow(address)
+        else:
+            buf = bytearray(REG_SIZE)
+            self.iface.read_into(address, buf)
         struct = Struct(buf, proto)
         struct[name] = value
-        self.iface.write(address, buf)
+        try:
+            self.iface.write(address, buf)
+        except OSError:
+            # the device state is unknown, so don't trust the shadow copy
+            self._shadow.pop(address, None)
+            raise
+
+    def read_register(self, name):
+        """ Read the whole register holding the given field in one transaction
+        and return it as a Struct, so that several of its fields can be
+        inspected without further reads.
+        """
+        address, proto = self._fields[name]
+
+        if address in self._cached:
+            buf = self._read_shadow(address)
+        else:
+            buf = self.iface.read(address)
+        return Struct(buf, proto)
+
+    def _read_shadow(self, address):
+        buf = self._shadow.get(address)
+        if buf is None:
+            buf = bytearray(REG_SIZE)
+            self.iface.read_into(address, buf)
+            self._shadow[address] = buf
+        return buf
+
+    def invalidate(self, name=None):
+        """ Drop the shadow copy of the register holding the given field, or
+        of every cached register if no name is given, so that the next access
+        reads the device again.
+        """
+        if name is None:
+            self._shadow.clear()
+        else:
+            address, _ = self._fields[name]
+            self._shadow.pop(address, None)
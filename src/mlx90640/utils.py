@@ -54,6 +54,8 @@ class StructProto:
 
 class Struct:
     def __init__(self, buf, proto):
+        # uctypes only keeps the address, so hold on to the buffer itself
+        self._buf = buf
         self._signed = proto.signed
         self._struct = uc_struct(addressof(buf), proto.layout, BIG_ENDIAN)
 
@@ -30,7 +30,101 @@ import utime as time
 from machine import Pin, I2C
 from mlx90640 import MLX90640
 from mlx90640.calibration import NUM_ROWS, NUM_COLS, IMAGE_SIZE, TEMP_K
-from mlx90640.image import ChessPattern, InterleavedPattern
+from mlx90640.image import ChessPattern, InterleavedPattern, RawImage, FramePool
+from mlx90640.utils import array_filled
+import event_log
+
+_EV_WAIT = event_log.logger.event("waiting for a camera frame", event_log.DEBUG)
+
+
+class BackgroundModel:
+    """!
+    @brief   Per-pixel running background estimate with a foreground image.
+    @details The background of each pixel is an exponential running mean of
+             its raw value, kept in fixed point (@c FRAC_BITS fractional
+             bits) in a preallocated array. Pixels warmer than the
+             background by more than a threshold are foreground; their
+             excess over the background is written to @c fg and everything
+             else is zeroed, so detectors can run on @c fg unchanged.
+             Foreground pixels are blended in much more slowly, so a target
+             which stops moving doesn't vanish at once. Memory use is
+             constant: 3 KB of background and 1.5 KB of foreground.
+    """
+
+    ## The number of fractional bits in the fixed-point background
+    FRAC_BITS = 4
+
+    def __init__(self, threshold=100, rate_shift=3, fg_rate_shift=8):
+        """!
+        @brief   Allocate the background and foreground arrays.
+        @param   threshold How far above background, in raw counts, a pixel
+                 must be to count as foreground (default 100)
+        @param   rate_shift Background pixels move 1/2**rate_shift of the way
+                 towards each new reading (default 3)
+        @param   fg_rate_shift The same for foreground pixels (default 8)
+        """
+        self.threshold = threshold << self.FRAC_BITS
+        self.rate_shift = rate_shift
+        self.fg_rate_shift = fg_rate_shift
+
+        ## Fixed-point background estimate of each pixel
+        self.bg = array_filled('l', IMAGE_SIZE)
+        ## Excess of each foreground pixel over its background, 0 elsewhere
+        self.fg = array_filled('h', IMAGE_SIZE)
+        ## The number of foreground pixels in each subpage
+        self.counts = [0, 0]
+
+        # Bit mask of the subpages whose background has been seeded
+        self._seeded = 0
+
+    def update(self, image, subpage):
+        """!
+        @brief   Update the model with a freshly read subpage.
+        @details The first time a subpage is seen its pixels seed the
+                 background and nothing is foreground.
+        @param   image The raw image holding the subpage
+        @param   subpage The @c Subpage which was just read into @c image
+        @returns The number of foreground pixels in the whole image
+        """
+        pix = image.pix
+        bg = self.bg
+        fg = self.fg
+        frac = self.FRAC_BITS
+        bit = 1 << subpage.id
+        if not self._seeded & bit:
+            for idx in subpage.sp_range():
+                bg[idx] = pix[idx] << frac
+                fg[idx] = 0
+            self._seeded |= bit
+            self.counts[subpage.id] = 0
+            return self.counts[0] + self.counts[1]
+
+        threshold = self.threshold
+        rate = self.rate_shift
+        fg_rate = self.fg_rate_shift
+        count = 0
+        for idx in subpage.sp_range():
+            back = bg[idx]
+            diff = (pix[idx] << frac) - back
+            if diff > threshold:
+                # Clamp so a hot target on a cold background fits in 16 bits
+                excess = diff >> frac
+                fg[idx] = excess if excess < 0x7FFF else 0x7FFF
+                bg[idx] = back + (diff >> fg_rate)
+                count += 1
+            else:
+                fg[idx] = 0
+                bg[idx] = back + (diff >> rate)
+        self.counts[subpage.id] = count
+        return self.counts[0] + self.counts[1]
+
+    def reset(self):
+        """!
+        @brief   Forget the background; the next subpages reseed it.
+        """
+        self._seeded = 0
+        self.counts[0] = 0
+        self.counts[1] = 0
 
 
 class MLX_Cam:
@@ -40,7 +134,7 @@ class MLX_Cam:
     """
 
     def __init__(self, i2c, address=0x33, pattern=ChessPattern,
-                 width=NUM_COLS, height=NUM_ROWS):
+                 width=NUM_COLS, height=NUM_ROWS, frames=2, background=None):
         """!
         @brief   Set up an MLX90640 camera.
         @param   i2c An I2C bus which has been set up to talk to the camera;
@@ -50,6 +144,10 @@ class MLX_Cam:
                  the pixels at a time (default ChessPattern)
         @param   width The width of the image in pixels; leave it at default
         @param   height The height of the image in pixels; leave it at default
+        @param   frames The number of image buffers; one is filled by the
+                 camera while the latest completed one is handed out
+        @param   background A @c BackgroundModel which is updated with every
+                 subpage, or @c None (default) to detect on raw images
         """
         ## The I2C bus to which the camera is attached
         self._i2c = i2c
@@ -62,13 +160,26 @@ class MLX_Cam:
         ## The height of the image in pixels, which should be 24
         self._height = height
 
+        ## The image buffers; the camera driver reads into the one being filled
+        self._frames = FramePool(frames)
+
         # The MLX90640 object that does the work
         self._camera = MLX90640(i2c, address)
         self._camera.set_pattern(pattern)
-        self._camera.setup()
+        self._camera.setup(raw=self._frames.filling)
+
+        ## A local reference to the latest complete image, None before the first
+        self._image = None
+
+        # Bit mask of the subpages read so far for the frame being acquired
+        self._sp_seen = 0
 
-        ## A local reference to the image object within the camera driver
-        self._image = self._camera.raw
+        # The image into which the most recent subpage was read
+        self._sp_image = None
+
+        ## The background model, if any, and its latest foreground count
+        self._background = background
+        self._fg_count = 0
         
     ## A "standard" set of characters of different densities to make ASCII art
     asc = " -.:=+*#%@"
@@ -98,24 +209,127 @@ class MLX_Cam:
         return
 
 
+    def poll_subpage(self):
+        """!
+        @brief   Read one subpage from the camera if one is ready.
+        @details The camera's status register is checked once. If a subpage
+                 is ready it is read into the image being filled; when both
+                 subpages of a frame have been read, the filled buffer is
+                 handed off as the latest image and the next buffer takes
+                 over. This is meant to be called once per run of a
+                 cooperative task.
+        @returns The @c Subpage which was read, or @c None if the camera had
+                 no new data. The image holding it is @c subpage_image().
+        """
+        status = self._camera.read_status()
+        if not status['data_available']:
+            return None
+
+        self._sp_image = self._camera.raw
+        self._camera.read_image(status=status)
+        subpage = self._camera.last_read
+        self._sp_seen |= 1 << subpage.id
+        if self._sp_seen == 0b11:
+            self._sp_seen = 0
+            self._frames.publish()
+            self._camera.raw = self._frames.filling
+            self._image = self._frames.latest
+        if self._background is not None:
+            self._fg_count = self._background.update(self._sp_image, subpage)
+        return subpage
+
+
+    @property
+    def has_foreground(self):
+        """!
+        @brief   Whether anything stands out from the background.
+        @details Always @c True when no background model is used. When it is
+                 @c False, detection can be skipped for the subpage.
+        """
+        return self._background is None or self._fg_count > 0
+
+
+    def detection_image(self):
+        """!
+        @brief   Get the image on which to run hot spot detection.
+        @returns The foreground image of the background model if there is
+                 one, otherwise the image holding the last subpage
+        """
+        if self._background is not None:
+            return self._background.fg
+        return self._sp_image
+
+
+    def subpage_image(self):
+        """!
+        @brief   Get the image into which the last subpage was read.
+        @details Only the pixels of that subpage are guaranteed to be fresh;
+                 the buffer may still be being filled, so it should be used
+                 before the next call to @c poll_subpage().
+        """
+        return self._sp_image
+
+
+    def poll(self):
+        """!
+        @brief   Advance the acquisition of an image without blocking.
+        @details Reads at most one subpage, as @c poll_subpage() does.
+        @returns A reference to the image object if this call completed a
+                 frame, or @c None if the frame isn't complete yet
+        """
+        seq = self._frames.seq
+        self.poll_subpage()
+        if self._frames.seq == seq:
+            return None
+        return self._image
+
+
+    @property
+    def frame_seq(self):
+        """!
+        @brief   The sequence number of the latest complete image.
+        @details It goes up by one each time a frame is completed, so a
+                 consumer can tell whether @c latest_image() is new to it.
+        """
+        return self._frames.seq
+
+
+    def latest_image(self):
+        """!
+        @brief   Get the latest complete image without touching the camera.
+        @returns The image, or @c None if no frame has been completed yet
+        """
+        return self._image
+
+
+    def frames(self):
+        """!
+        @brief   Generator which acquires images without blocking.
+        @details Each step checks the camera once and yields @c None while a
+                 frame is still being acquired, or the image when one has
+                 been completed.
+        """
+        while True:
+            yield self.poll()
+
+
     def get_image(self):
         """!
         @brief   Get one image from a MLX90640 camera.
         @details Grab one image from the given camera and return it. Both
                  subframes (the odd checkerboard portions of the image) are
                  grabbed and combined (maybe; this is the raw version, so the
-                 combination is sketchy and not fully tested). It is assumed
-                 that the camera is in the ChessPattern (default) mode as it
-                 probably should be.
+                 combination is sketchy and not fully tested). This blocks
+                 until a frame is complete; tasks should use @c poll()
+                 instead.
         @returns A reference to the image object we've just filled with data
         """
-        for subpage in (0, 1):
-            while not self._camera.has_data:
-                time.sleep_ms(50)
-                print('.', end='')
-            image = self._camera.read_image(subpage)
-
-        return image
+        while True:
+            image = self.poll()
+            if image is not None:
+                return image
+            time.sleep_ms(50)
+            event_log.logger.log(_EV_WAIT)
 
     def find_hotSpot(self, array):
         """!
@@ -124,10 +338,13 @@ class MLX_Cam:
                  compute a local average (in groups of four). These averages
                  are then compiled into an array, and the indeces are used to
                  pinpoint the location of this cluster in a 24x32 array.
-        @param   array The array to be shown, probably @c image
+        @param   array The array to be shown, probably @c image; a raw image
+                 is read through its buffer view rather than copied
         @returns A set of coordinates pertaining to the hottest average cluster,
                  with the assumption that the array is 24x32.
         """
+        if isinstance(array, RawImage):
+            array = array.view
         av = []
         cAvg = 0
         for row in range(self._height):
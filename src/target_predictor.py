@@ -0,0 +1,99 @@
+"""!
+@file target_predictor.py
+This file contains a predictor which estimates where a target is between
+camera measurements, so that the control tasks can aim at where the target
+is now rather than where it was when the last image was taken.
+
+@author mecha12
+@date   17-Oct-2026
+"""
+
+import utime # Micropython version of time library
+
+
+class AlphaBetaPredictor:
+    """!
+    Constant-velocity alpha-beta filter for one axis.
+
+    Each measurement corrects the predicted position by a fraction
+    @c alpha of the residual and the velocity by a fraction @c beta of the
+    residual divided by the time since the last measurement; this is the
+    steady-state form of a constant-velocity Kalman filter. Between
+    measurements @c predict() extrapolates the position at the estimated
+    velocity, for at most @c horizon milliseconds so that a lost target
+    doesn't send the turret off on its own.
+    """
+
+    def __init__(self, alpha=0.6, beta=0.2, horizon=1000):
+        """!
+        Set up the predictor with no measurements yet.
+        @param alpha The position correction gain, between 0 and 1
+        @param beta The velocity correction gain, between 0 and 1
+        @param horizon The longest time in milliseconds over which a
+               prediction is extrapolated past the last measurement
+        """
+        self.alpha = alpha
+        self.beta = beta
+        self.horizon = int(horizon * 1000)
+        self.reset()
+
+    def reset(self):
+        """!
+        Forget the target; the next measurement starts a new estimate.
+        """
+        ## The estimated position at the time of the last measurement
+        self.x = 0.0
+        ## The estimated velocity in units per microsecond
+        self.v = 0.0
+        ## @c True once at least one measurement has been made
+        self.ready = False
+        self._t = 0
+
+    def measure(self, z, t_us):
+        """!
+        Correct the estimate with a new measurement.
+        @param z The measured position
+        @param t_us The time of the measurement from @c utime.ticks_us()
+        """
+        if not self.ready:
+            self.x = z
+            self.v = 0.0
+            self._t = t_us
+            self.ready = True
+            return
+
+        dt = utime.ticks_diff(t_us, self._t)
+        if dt <= 0:
+            self.x = z
+            return
+
+        predicted = self.x + self.v * dt
+        residual = z - predicted
+        self.x = predicted + self.alpha * residual
+        self.v += self.beta * residual / dt
+        self._t = t_us
+
+    def predict(self, t_us):
+        """!
+        Extrapolate the position to a given time.
+        @param t_us The time from @c utime.ticks_us() at which the position
+               is wanted
+        @return The predicted position
+        """
+        dt = utime.ticks_diff(t_us, self._t)
+        if dt < 0:
+            dt = 0
+        elif dt > self.horizon:
+            dt = self.horizon
+        return self.x + self.v * dt
+
+    def offset(self, t_us):
+        """!
+        Find how far the target is predicted to have moved since the last
+        measurement, to be added to a setpoint computed from that measurement.
+        @param t_us The time from @c utime.ticks_us() at which it's wanted
+        @return The predicted change in position, 0 before any measurement
+        """
+        if not self.ready:
+            return 0.0
+        return self.predict(t_us) - self.x
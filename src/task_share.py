@@ -26,12 +26,16 @@ import array
 import gc
 import pyb
 import micropython
+import utime
 
 
 ## This is a system-wide list of all the queues and shared variables. It is
 #  used to create diagnostic printouts. 
 share_list = []
 
+# A marker which can't be an item, returned by an empty queue's try_get()
+_EMPTY = object ()
+
 ## This dictionary allows readable printouts of queue and share data types.
 type_code_strings = {'b' : "int8",   'B' : "uint8",
                      'h' : "int16",  'H' : "uint16",
@@ -71,10 +75,52 @@ class BaseShare:
         self._type_code = type_code
         self._thread_protect = thread_protect
 
+        # Tasks which are woken whenever data is written, and tasks which are
+        # woken only when a share's value changes
+        self._subscribers = []
+        self._change_subscribers = []
+
         # Add this queue to the global share and queue list
         share_list.append (self)
 
 
+    def subscribe (self, task, on_change = False):
+        """!
+        Wake a task when data is written into this queue or share.
+
+        After each write, including writes from an ISR, the task's @c go()
+        method is called, so a task created with a period of @c None runs
+        only when there is new data for it rather than polling:
+        @code
+        |   my_task = cotask.Task (my_task_fun, priority = 2, period = None)
+        |   my_share.subscribe (my_task, on_change = True)
+        @endcode
+        Subscribing a timed task makes it run early when data arrives, in
+        addition to its regular runs.
+        @param task The task to be woken, or any object with a @c go() method
+        @param on_change If @c True, a share wakes the task only when the
+               value written differs from the value it held; queues wake
+               their subscribers on every write
+        """
+        if on_change:
+            self._change_subscribers.append (task)
+        else:
+            self._subscribers.append (task)
+
+
+    @micropython.native
+    def _wake (self, changed):
+        """!
+        Call the @c go() methods of the subscribed tasks after a write.
+        @param changed @c True if the value written was new
+        """
+        for task in self._subscribers:
+            task.go ()
+        if changed:
+            for task in self._change_subscribers:
+                task.go ()
+
+
 # ============================================================================
 
 class Queue (BaseShare):
@@ -153,6 +199,9 @@ class Queue (BaseShare):
             self._buffer = None
             raise
 
+        # A view of the buffer through which blocks of items are copied
+        self._view = memoryview (self._buffer)
+
         # Initialize pointers to be used for reading and writing data
         self.clear ()
 
@@ -168,10 +217,11 @@ class Queue (BaseShare):
 
         If there isn't room for the item, wait (blocking the calling process)
         until room becomes available, unless the @c overwrite constructor
-        parameter was set to @c True to allow old data to be clobbered. If
-        non-blocking behavior without overwriting is needed, one should call
-        @c full() to ensure that the queue is not full before putting data
-        into it:
+        parameter was set to @c True to allow old data to be clobbered. Under
+        the cooperative scheduler the task which would make room can't run
+        while this one waits, so tasks should use @c try_put() or
+        @c put_timeout() instead, or call @c full() to ensure that the queue
+        is not full before putting data into it:
         @code
         |   def some_task ():
         |       # Setup
@@ -199,20 +249,15 @@ class Queue (BaseShare):
             _irq_state = pyb.disable_irq ()
 
         # Write the data and advance the counts and pointers
-        self._buffer[self._wr_idx] = item
-        self._wr_idx += 1
-        if self._wr_idx >= self._size:
-            self._wr_idx = 0
-        self._num_items += 1
-        if self._num_items >= self._size:        # Can't be fuller than full
-            self._num_items = self._size
-        if self._num_items > self._max_full:     # Record maximum fillage
-            self._max_full = self._num_items
+        self._write (item)
 
         # Re-enable interrupts
         if self._thread_protect and not in_ISR:
             pyb.enable_irq (_irq_state)
 
+        # Every item put into a queue is new data for its subscribers
+        self._wake (True)
+
 
     @micropython.native
     def get (self, in_ISR = False):
@@ -221,8 +266,9 @@ class Queue (BaseShare):
 
         If there isn't anything in there, wait (blocking the calling process)
         until something becomes available. If non-blocking reads are needed,
-        one should call @c any() to check for items before attempting to read
-        from the queue. This is usually done in a low priority task:
+        one should use @c try_get() or @c get_timeout(), or call @c any() to
+        check for items before attempting to read from the queue. This is
+        usually done in a low priority task:
         @code
         |   def some_task ():
         |       # Setup
@@ -243,22 +289,277 @@ class Queue (BaseShare):
         if self._thread_protect and not in_ISR:
             irq_state = pyb.disable_irq ()
 
-        # Get the item to be returned from the queue
-        to_return = self._buffer[self._rd_idx]
+        # Get the item to be returned from the queue and move the read pointer
+        to_return = self._read ()
+
+        # Re-enable interrupts
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq (irq_state)
 
-        # Move the read pointer and adjust the number of items in the queue
+        return (to_return)
+
+
+    @micropython.native
+    def _write (self, item):
+        # Write an item and advance the counts and pointers; the caller
+        # checks for room and blocks interrupts if needed
+        self._buffer[self._wr_idx] = item
+        self._wr_idx += 1
+        if self._wr_idx >= self._size:
+            self._wr_idx = 0
+        self._num_items += 1
+        if self._num_items >= self._size:        # Can't be fuller than full
+            self._num_items = self._size
+        if self._num_items > self._max_full:     # Record maximum fillage
+            self._max_full = self._num_items
+
+
+    @micropython.native
+    def _read (self):
+        # Read the oldest item and advance the read pointer; the caller
+        # checks for items and blocks interrupts if needed
+        to_return = self._buffer[self._rd_idx]
         self._rd_idx += 1
         if self._rd_idx >= self._size:
             self._rd_idx = 0
         self._num_items -= 1
         if self._num_items < 0:
             self._num_items = 0
+        return to_return
+
+
+    @micropython.native
+    def try_put (self, item, in_ISR = False):
+        """!
+        Put an item into the queue if there's room, without waiting.
+
+        If the queue is full and the @c overwrite constructor parameter was
+        not set, the item is not put and this method returns @c False at
+        once. The check and the write are made with interrupts blocked, so
+        an ISR can't fill the queue in between:
+        @code
+        |   def some_task ():
+        |       while True:
+        |           if not my_queue.try_put (create_something_to_put ()):
+        |               count_dropped_item ()
+        |           yield 0
+        @endcode
+        @param item The item to be placed into the queue
+        @param in_ISR Set this to @c True if calling from within an ISR
+        @return @c True if the item was put into the queue, @c False if not
+        """
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq ()
+
+        put_ok = self._overwrite or self._num_items < self._size
+        if put_ok:
+            self._write (item)
 
-        # Re-enable interrupts
         if self._thread_protect and not in_ISR:
             pyb.enable_irq (irq_state)
 
-        return (to_return)
+        if put_ok:
+            self._wake (True)
+        return put_ok
+
+
+    @micropython.native
+    def try_get (self, default = None, in_ISR = False):
+        """!
+        Read an item from the queue if there is one, without waiting.
+
+        If the queue is empty, @c default is returned at once. When
+        @c default could also be a valid item, call @c any() first or pass
+        a value which can't be in the queue:
+        @code
+        |   def some_task ():
+        |       while True:
+        |           something = my_queue.try_get ()
+        |           if something is not None:
+        |               do_something_with (something)
+        |           yield 0
+        @endcode
+        @param default The value to return if the queue is empty
+        @param in_ISR Set this to @c True if calling from within an ISR
+        @return The oldest item in the queue, or @c default if it's empty
+        """
+        if self._thread_protect and not in_ISR:
+            irq_state = pyb.disable_irq ()
+
+        if self._num_items > 0:
+            to_return = self._read ()
+        else:
+            to_return = default
+
+        if self._thread_protect and not in_ISR:
+            pyb.enable_irq (irq_state)
+
+        return to_return
+
+
+    def put_timeout (self, item, timeout_us, in_ISR = False):
+        """!
+        Put an item into the queue, waiting at most @c timeout_us for room.
+
+        This waits by busy-polling like @c put(), so it's useful when the
+        queue is emptied by an ISR or another thread. Room made by another
+        cooperative task can't appear during the wait, so from a task with a
+        short timeout it acts as a bounded @c put() which can't deadlock.
+        @param item The item to be placed into the queue
+        @param timeout_us The longest time to wait in microseconds
+        @param in_ISR Set this to @c True if calling from within an ISR
+        @return @c True if the item was put into the queue, @c False if the
+                time ran out
+        """
+        start = utime.ticks_us ()
+        while not self.try_put (item, in_ISR):
+            if utime.ticks_diff (utime.ticks_us (), start) >= timeout_us:
+                return False
+        return True
+
+
+    def get_timeout (self, timeout_us, default = None, in_ISR = False):
+        """!
+        Read an item from the queue, waiting at most @c timeout_us for one.
+
+        Like @c put_timeout(), this busy-polls while the queue is empty and
+        gives up when the time runs out.
+        @param timeout_us The longest time to wait in microseconds
+        @param default The value to return if the time runs out
+        @param in_ISR Set this to @c True if calling from within an ISR
+        @return The oldest item in the queue, or @c default if none arrived
+                in time
+        """
+        start = utime.ticks_us ()
+        while True:
+            to_return = self.try_get (_EMPTY, in_ISR)
+            if to_return is not _EMPTY:
+                return to_return
+            if utime.ticks_diff (utime.ticks_us (), start) >= timeout_us:
+                return default
+
+
+    def _block_view (self, block, type_code):
+        # Return a memoryview through which a block can be copied to or from
+        # the buffer in slices, or None if the block must be copied item by
+        # item. MicroPython's memoryview doesn't tell what type its items
+        # are, so the caller's word for the block's type code is taken
+        if type_code != self._type_code:
+            return None
+        try:
+            return memoryview (block)
+        except TypeError:
+            return None
+
+
+    def put_many (self, items, type_code = None):
+        """!
+        Put as many items from a block as there's room for, without waiting.
+
+        When @c items is an array or other buffer and @c type_code says that
+        it holds items of the queue's type, the items are copied in at most
+        two memoryview slices, one up to the end of the ring buffer and one
+        from its start, with interrupts blocked only once for the whole
+        block. Other blocks are copied item by item. The type code can't be
+        checked on the board, so a buffer of some other type given the
+        queue's type code is copied as raw memory. Items which don't fit are
+        not put, even if the @c overwrite constructor parameter was set, so
+        the caller can offer them again later:
+        @code
+        |   samples = array.array ('h', range (32))
+        |   sent = my_queue.put_many (samples, 'h')
+        @endcode
+        Slicing a memoryview allocates a small object, so this method must
+        not be called from an ISR.
+        @param items An array, memoryview or sequence of items to put
+        @param type_code The type code of the items in @c items if it's an
+               array or memoryview, or @c None to copy item by item
+        @return The number of items put into the queue, from the start of
+                @c items
+        """
+        src = self._block_view (items, type_code)
+
+        if self._thread_protect:
+            irq_state = pyb.disable_irq ()
+        try:
+            count = self._size - self._num_items
+            if count > len (items):
+                count = len (items)
+            if src is not None:
+                # Copy up to the end of the ring buffer, then wrap to its start
+                first = self._size - self._wr_idx
+                if first > count:
+                    first = count
+                self._view[self._wr_idx : self._wr_idx + first] = src[:first]
+                if count > first:
+                    self._view[: count - first] = src[first : count]
+                self._wr_idx += count
+                if self._wr_idx >= self._size:
+                    self._wr_idx -= self._size
+                self._num_items += count
+                if self._num_items > self._max_full:
+                    self._max_full = self._num_items
+            else:
+                for idx in range (count):
+                    self._write (items[idx])
+        finally:
+            # Interrupts must come back on even if an item can't be stored
+            if self._thread_protect:
+                pyb.enable_irq (irq_state)
+
+        if count:
+            self._wake (True)
+        return count
+
+
+    def get_many (self, out, type_code = None):
+        """!
+        Read as many items as are available into a block, without waiting.
+
+        This is the reverse of @c put_many(): when @c out is an array or
+        other writable buffer and @c type_code is the queue's type code, the
+        items are copied out in at most two memoryview slices with
+        interrupts blocked once. Other blocks are filled item by item. No
+        more than @c len(out) items are read:
+        @code
+        |   block = array.array ('h', range (32))
+        |   for idx in range (my_queue.get_many (block, 'h')):
+        |       do_something_with (block[idx])
+        @endcode
+        This method must not be called from an ISR.
+        @param out An array, memoryview or list to fill with items
+        @param type_code The type code of the items in @c out if it's an
+               array or writable memoryview, or @c None to copy item by item
+        @return The number of items read into the start of @c out
+        """
+        dest = self._block_view (out, type_code)
+
+        if self._thread_protect:
+            irq_state = pyb.disable_irq ()
+        try:
+            count = self._num_items
+            if count > len (out):
+                count = len (out)
+            if dest is not None:
+                # Copy up to the end of the ring buffer, then wrap to its start
+                first = self._size - self._rd_idx
+                if first > count:
+                    first = count
+                dest[:first] = self._view[self._rd_idx : self._rd_idx + first]
+                if count > first:
+                    dest[first : count] = self._view[: count - first]
+                self._rd_idx += count
+                if self._rd_idx >= self._size:
+                    self._rd_idx -= self._size
+                self._num_items -= count
+            else:
+                for idx in range (count):
+                    out[idx] = self._read ()
+        finally:
+            if self._thread_protect:
+                pyb.enable_irq (irq_state)
+
+        return count
 
 
     @micropython.native
@@ -410,12 +711,16 @@ class Share (BaseShare):
         if self._thread_protect and not in_ISR:
             irq_state = pyb.disable_irq ()
 
+        changed = self._buffer[0] != data
         self._buffer[0] = data
 
         # Re-enable interrupts
         if self._thread_protect and not in_ISR:
             pyb.enable_irq (irq_state)
 
+        # Let subscribed tasks know that there's data for them
+        self._wake (changed)
+
 
     @micropython.native
     def get (self, in_ISR = False):